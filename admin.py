@@ -1,11 +1,131 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
-from models import User, Company, Portfolio, Vacancy, Application, db
+from models import User, Company, Portfolio, Vacancy, DeletionTask, db
 from datetime import datetime
-from sqlalchemy import desc, asc
+from pagination import keyset_paginate, cached_count, get_per_page
+from counters import get_counters
+from page_cache import page_cache
+from facets import facet_cache
+from identity import invalidate_identity
+from export import EXPORT_COLUMNS, EXPORT_FORMATS, export_stream
+from perf import summarize, DEFAULT_WINDOW
+from throttling import login_throttle
+from bulk import (MODERATED_MODELS, DELETE_HANDLERS, matching_ids, parse_ids,
+                  set_approval, set_vacancies_active)
+from deletions import (TARGET_TYPES, delete_now, is_large_delete, enqueue_deletion, start_in_background,
+                       task_progress)
 
 admin = Blueprint('admin', __name__)
 
+# Доступные поля для сортировки списков и выгрузок
+SORT_FIELDS = {
+    'users': ['id', 'name', 'email', 'role', 'created_at', 'last_login'],
+    'vacancies': ['id', 'title', 'created_at', 'updated_at', 'is_active', 'is_approved'],
+    'portfolios': ['id', 'title', 'profession', 'experience_years', 'created_at', 'updated_at', 'is_approved'],
+    'companies': ['id', 'company_name', 'industry', 'created_at', 'updated_at', 'is_approved'],
+    'applications': ['id', 'vacancy_id', 'seeker_id', 'status', 'created_at'],
+}
+
+
+def paginate_list(model, sort_by, order):
+    """Keyset-пагинация списка админки по выбранному полю сортировки с id в качестве тай-брейкера"""
+    query = model.query
+    page = keyset_paginate(query, getattr(model, sort_by), model.id,
+                           descending=(order == 'desc'),
+                           cursor=request.args.get('cursor'),
+                           direction=request.args.get('direction', 'next'),
+                           per_page=get_per_page(request.args))
+    # Общее количество кэшируется, чтобы не выполнять COUNT(*) на каждой странице
+    page.total = cached_count(f'admin.{model.__tablename__}', query)
+    return page
+
+
+BULK_ACTION_MESSAGES = {
+    'approve': 'Одобрено',
+    'reject': 'Отклонено',
+    'toggle': 'Статус изменён',
+    'activate': 'Активировано',
+    'deactivate': 'Деактивировано',
+    'delete': 'Удалено',
+}
+
+
+def run_bulk_action(kind, list_endpoint):
+    """Массовая модерация: выбранные id или все записи на модерации, одна транзакция на запрос"""
+    model = MODERATED_MODELS[kind]
+    action = request.form.get('action')
+    scope = request.form.get('scope', 'selected')
+    company_id = request.form.get('company_id', type=int)
+
+    allowed = {'approve', 'reject', 'delete'}
+    if model is Vacancy:
+        allowed |= {'toggle', 'activate', 'deactivate'}
+    if action not in allowed:
+        flash('Неизвестное действие')
+        return redirect(url_for(list_endpoint))
+
+    if scope == 'pending':
+        criteria = [model.is_approved == db.false()]
+        # Например, «все вакансии компании X на модерации»
+        if model is Vacancy and company_id:
+            criteria.append(Vacancy.company_id == company_id)
+        ids = matching_ids(model, *criteria)
+    else:
+        ids = parse_ids(request.form.getlist('ids'))
+
+    # Большое массовое удаление, как и одиночное, уходит в фоновые задачи
+    if action == 'delete' and ids and is_large_delete(TARGET_TYPES[model], *ids):
+        return enqueue_bulk_deletion(TARGET_TYPES[model], ids, list_endpoint)
+
+    if action == 'approve':
+        affected = set_approval(model, ids, True)
+    elif action == 'reject':
+        affected = set_approval(model, ids, False)
+    elif action == 'delete':
+        affected = DELETE_HANDLERS[model](ids)
+    else:
+        affected = set_vacancies_active(ids, {'toggle': None, 'activate': True, 'deactivate': False}[action])
+
+    db.session.commit()
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'action': action, 'requested': len(ids), 'affected': affected})
+
+    flash(f'{BULK_ACTION_MESSAGES[action]}: {affected} из {len(ids)}')
+    if model is Vacancy and company_id:
+        return redirect(url_for('admin.view_company', company_id=company_id))
+    return redirect(url_for(list_endpoint))
+
+
+def enqueue_bulk_deletion(target_type, ids, list_endpoint):
+    """Ставит задачу на каждый объект одной транзакцией и выполняет их в одном фоновом потоке"""
+    tasks = [enqueue_deletion(target_type, target_id, commit=False) for target_id in ids]
+    db.session.commit()
+    task_ids = [task.id for task in tasks]
+    start_in_background(*task_ids)
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'action': 'delete', 'requested': len(ids), 'tasks': task_ids}), 202
+    flash(f'Удаление {len(ids)} объектов запущено в фоне (задачи #{task_ids[0]}-#{task_ids[-1]}). '
+          f'Прогресс: {url_for("admin.deletion_progress", task_id=task_ids[-1])}')
+    return redirect(url_for(list_endpoint))
+
+
+def delete_with_dependents(target_type, target_id, list_endpoint, message):
+    """Удаляет объект набором DELETE ... WHERE ... IN, а очень большие - фоновой задачей"""
+    if is_large_delete(target_type, target_id):
+        task = enqueue_deletion(target_type, target_id)
+        start_in_background(task.id)
+        flash(f'Удаление запущено в фоне (задача #{task.id}). '
+              f'Прогресс: {url_for("admin.deletion_progress", task_id=task.id)}')
+        return redirect(url_for(list_endpoint))
+
+    delete_now(target_type, target_id)
+    db.session.commit()
+
+    flash(message)
+    return redirect(url_for(list_endpoint))
+
 
 @admin.route('/admin')
 @login_required
@@ -14,15 +134,8 @@ def admin_panel():
         flash('Доступ запрещен')
         return redirect(url_for('index'))
 
-    stats = {
-        'users_count': User.query.count(),
-        'companies_count': Company.query.count(),
-        'vacancies_count': Vacancy.query.count(),
-        'applications_count': Application.query.count(),
-        'pending_vacancies': Vacancy.query.filter_by(is_approved=False).count(),
-        'pending_portfolios': Portfolio.query.filter_by(is_approved=False).count(),
-        'pending_companies': Company.query.filter_by(is_approved=False).count()
-    }
+    # Счётчики поддерживаются событиями моделей, здесь - одно чтение вместо семи COUNT(*)
+    stats = get_counters()
 
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
     recent_vacancies = Vacancy.query.order_by(Vacancy.created_at.desc()).limit(5).all()
@@ -33,6 +146,75 @@ def admin_panel():
                            recent_vacancies=recent_vacancies)
 
 
+@admin.route('/admin/cache')
+@login_required
+def cache_stats():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Доступ запрещен'}), 403
+
+    # Статистика кэша страниц текущего процесса, кэш фасетов - отдельным ключом
+    stats = page_cache.stats()
+    stats['facets'] = facet_cache.stats()
+    return jsonify(stats)
+
+
+@admin.route('/admin/perf')
+@login_required
+def perf_report():
+    if current_user.role != 'admin':
+        flash('Доступ запрещен')
+        return redirect(url_for('index'))
+
+    # Окно в минутах; данные - последние запросы текущего процесса
+    window = request.args.get('window', DEFAULT_WINDOW // 60, type=int)
+    report = summarize(window=max(window, 1) * 60)
+    # Счётчики входа накапливаются с запуска процесса, окно на них не влияет
+    report['login'] = login_throttle().stats()
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(report)
+    return render_template('admin/perf.html', report=report, window=window)
+
+
+@admin.route('/admin/deletions/<int:task_id>')
+@login_required
+def deletion_progress(task_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Доступ запрещен'}), 403
+
+    task = DeletionTask.query.get_or_404(task_id)
+    return jsonify(task_progress(task))
+
+
+@admin.route('/admin/export/<dataset>')
+@login_required
+def export_dataset(dataset):
+    if current_user.role != 'admin':
+        flash('Доступ запрещен')
+        return redirect(url_for('index'))
+
+    if dataset not in EXPORT_COLUMNS:
+        abort(404)
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+
+    # Те же поля сортировки, что и в списках админки
+    sort_by = request.args.get('sort', 'id')
+    order = request.args.get('order', 'asc')
+    if sort_by not in SORT_FIELDS[dataset]:
+        sort_by = 'id'
+
+    # Строки отдаются по мере чтения из базы, таблица целиком в память не попадает
+    filename = f"{dataset}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(export_stream(dataset, export_format, sort_by, order)),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
 @admin.route('/admin/users')
 @login_required
 def manage_users():
@@ -45,15 +227,11 @@ def manage_users():
     order = request.args.get('order', 'asc')
 
     # Доступные поля для сортировки
-    valid_sort_fields = ['id', 'name', 'email', 'role', 'created_at', 'last_login']
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS['users']:
         sort_by = 'id'
 
-    # Применяем сортировку
-    if order == 'desc':
-        users = User.query.order_by(desc(getattr(User, sort_by))).all()
-    else:
-        users = User.query.order_by(asc(getattr(User, sort_by))).all()
+    # Применяем сортировку и постраничный вывод
+    users = paginate_list(User, sort_by, order)
 
     return render_template('admin/users.html',
                            users=users,
@@ -78,6 +256,7 @@ def delete_user(user_id):
     # Мягкое удаление - деактивация пользователя
     user.is_active = False
     db.session.commit()
+    invalidate_identity(user.id)
 
     flash(f'Пользователь {user.name} деактивирован')
     return redirect(url_for('admin.manage_users'))
@@ -93,6 +272,7 @@ def activate_user(user_id):
     user = User.query.get_or_404(user_id)
     user.is_active = True
     db.session.commit()
+    invalidate_identity(user.id)
 
     flash(f'Пользователь {user.name} активирован')
     return redirect(url_for('admin.manage_users'))
@@ -110,15 +290,11 @@ def manage_vacancies():
     order = request.args.get('order', 'asc')
 
     # Доступные поля для сортировки
-    valid_sort_fields = ['id', 'title', 'created_at', 'updated_at', 'is_active', 'is_approved']
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS['vacancies']:
         sort_by = 'id'
 
-    # Применяем сортировку
-    if order == 'desc':
-        vacancies = Vacancy.query.order_by(desc(getattr(Vacancy, sort_by))).all()
-    else:
-        vacancies = Vacancy.query.order_by(asc(getattr(Vacancy, sort_by))).all()
+    # Применяем сортировку и постраничный вывод
+    vacancies = paginate_list(Vacancy, sort_by, order)
 
     return render_template('admin/vacancies.html',
                            vacancies=vacancies,
@@ -126,6 +302,16 @@ def manage_vacancies():
                            order=order)
 
 
+@admin.route('/admin/vacancies/bulk', methods=['POST'])
+@login_required
+def bulk_vacancies():
+    if current_user.role != 'admin':
+        flash('Доступ запрещен')
+        return redirect(url_for('index'))
+
+    return run_bulk_action('vacancies', 'admin.manage_vacancies')
+
+
 @admin.route('/admin/vacancy/<int:vacancy_id>')
 @login_required
 def view_vacancy(vacancy_id):
@@ -186,19 +372,10 @@ def delete_vacancy(vacancy_id):
         flash('Доступ запрещен')
         return redirect(url_for('index'))
 
-    vacancy = Vacancy.query.get_or_404(vacancy_id)
-
-    # Сначала удаляем все связанные заявки
-    applications = Application.query.filter_by(vacancy_id=vacancy_id).all()
-    for application in applications:
-        db.session.delete(application)
-
-    # Затем удаляем саму вакансию
-    db.session.delete(vacancy)
-    db.session.commit()
+    Vacancy.query.get_or_404(vacancy_id)
 
-    flash('Вакансия и связанные заявки удалены')
-    return redirect(url_for('admin.manage_vacancies'))
+    return delete_with_dependents('vacancy', vacancy_id, 'admin.manage_vacancies',
+                                  'Вакансия и связанные заявки удалены')
 
 
 @admin.route('/admin/portfolio/<int:portfolio_id>')
@@ -249,19 +426,10 @@ def delete_portfolio(portfolio_id):
         flash('Доступ запрещен')
         return redirect(url_for('index'))
 
-    portfolio = Portfolio.query.get_or_404(portfolio_id)
+    Portfolio.query.get_or_404(portfolio_id)
 
-    # Сначала удаляем все связанные заявки
-    applications = Application.query.filter_by(portfolio_id=portfolio_id).all()
-    for application in applications:
-        db.session.delete(application)
-
-    # Затем удаляем само портфолио
-    db.session.delete(portfolio)
-    db.session.commit()
-
-    flash('Портфолио и связанные заявки удалены')
-    return redirect(url_for('admin.manage_portfolios'))
+    return delete_with_dependents('portfolio', portfolio_id, 'admin.manage_portfolios',
+                                  'Портфолио и связанные заявки удалены')
 
 
 @admin.route('/admin/portfolios')
@@ -291,15 +459,11 @@ def manage_portfolios():
     order = request.args.get('order', 'asc')
 
     # Доступные поля для сортировки
-    valid_sort_fields = ['id', 'title', 'profession', 'experience_years', 'created_at', 'updated_at', 'is_approved']
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS['portfolios']:
         sort_by = 'id'
 
-    # Применяем сортировку
-    if order == 'desc':
-        portfolios = Portfolio.query.order_by(desc(getattr(Portfolio, sort_by))).all()
-    else:
-        portfolios = Portfolio.query.order_by(asc(getattr(Portfolio, sort_by))).all()
+    # Применяем сортировку и постраничный вывод
+    portfolios = paginate_list(Portfolio, sort_by, order)
 
     return render_template('admin/portfolios.html',
                            portfolios=portfolios,
@@ -307,6 +471,16 @@ def manage_portfolios():
                            order=order)
 
 
+@admin.route('/admin/portfolios/bulk', methods=['POST'])
+@login_required
+def bulk_portfolios():
+    if current_user.role != 'admin':
+        flash('Доступ запрещен')
+        return redirect(url_for('index'))
+
+    return run_bulk_action('portfolios', 'admin.manage_portfolios')
+
+
 @admin.route('/admin/company/<int:company_id>')
 @login_required
 def view_company(company_id):
@@ -357,24 +531,10 @@ def delete_company(company_id):
         flash('Доступ запрещен')
         return redirect(url_for('index'))
 
-    company = Company.query.get_or_404(company_id)
+    Company.query.get_or_404(company_id)
 
-    # Сначала удаляем все вакансии компании и связанные заявки
-    vacancies = Vacancy.query.filter_by(company_id=company_id).all()
-    for vacancy in vacancies:
-        # Удаляем заявки на эту вакансию
-        applications = Application.query.filter_by(vacancy_id=vacancy.id).all()
-        for application in applications:
-            db.session.delete(application)
-        # Удаляем вакансию
-        db.session.delete(vacancy)
-
-    # Затем удаляем саму компанию
-    db.session.delete(company)
-    db.session.commit()
-
-    flash('Компания, её вакансии и связанные заявки удалены')
-    return redirect(url_for('admin.manage_companies'))
+    return delete_with_dependents('company', company_id, 'admin.manage_companies',
+                                  'Компания, её вакансии и связанные заявки удалены')
 
 
 @admin.route('/admin/companies')
@@ -389,17 +549,23 @@ def manage_companies():
     order = request.args.get('order', 'asc')
 
     # Доступные поля для сортировки
-    valid_sort_fields = ['id', 'company_name', 'industry', 'created_at', 'updated_at', 'is_approved']
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS['companies']:
         sort_by = 'id'
 
-    # Применяем сортировку
-    if order == 'desc':
-        companies = Company.query.order_by(desc(getattr(Company, sort_by))).all()
-    else:
-        companies = Company.query.order_by(asc(getattr(Company, sort_by))).all()
+    # Применяем сортировку и постраничный вывод
+    companies = paginate_list(Company, sort_by, order)
 
     return render_template('admin/companies.html',
                            companies=companies,
                            sort_by=sort_by,
-                           order=order)
\ No newline at end of file
+                           order=order)
+
+
+@admin.route('/admin/companies/bulk', methods=['POST'])
+@login_required
+def bulk_companies():
+    if current_user.role != 'admin':
+        flash('Доступ запрещен')
+        return redirect(url_for('index'))
+
+    return run_bulk_action('companies', 'admin.manage_companies')
\ No newline at end of file
@@ -0,0 +1,117 @@
+import hashlib
+from datetime import timezone
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from models import db, Vacancy
+from page_cache import current_generation, normalized_query_string
+from seeker import paginate_vacancies
+from bulk import parse_ids
+
+api = Blueprint('api', __name__)
+
+# Сколько вакансий можно запросить одним batch-запросом
+MAX_BATCH_IDS = 100
+
+
+def vacancy_to_dict(vacancy):
+    return {
+        'id': vacancy.id,
+        'title': vacancy.title,
+        'description': vacancy.description,
+        'requirements': vacancy.requirements,
+        'salary_min': vacancy.salary_min,
+        'salary_max': vacancy.salary_max,
+        'employment_type': vacancy.employment_type,
+        'experience_level': vacancy.experience_level,
+        'location': vacancy.location,
+        'company': {
+            'id': vacancy.company.id,
+            'name': vacancy.company.company_name,
+        },
+        'created_at': vacancy.created_at.isoformat() if vacancy.created_at else None,
+        'updated_at': vacancy.updated_at.isoformat() if vacancy.updated_at else None,
+    }
+
+
+def listing_validators():
+    """
+    ETag и Last-Modified без чтения самих вакансий: max(updated_at) по индексу и
+    поколение списков, которое меняется и при удалениях, и при переименовании компаний.
+    """
+    last_modified = db.session.query(func.max(Vacancy.updated_at)).scalar()
+    fingerprint = f'{current_generation()}|{last_modified}|{request.path}|{normalized_query_string()}'
+    etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional_json(build_payload):
+    """Отвечает 304, если у клиента актуальная версия, иначе строит JSON"""
+    etag, last_modified = listing_validators()
+    if not_modified(etag, last_modified):
+        response = jsonify()
+        response.status_code = 304
+        response.set_data(b'')
+    else:
+        response = jsonify(build_payload())
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Кэшировать можно, но перед использованием нужно перепроверить
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+@api.route('/api/vacancies')
+def list_vacancies():
+    salary_min = request.args.get('salary_min', '')
+    if salary_min and not salary_min.isdigit():
+        return jsonify({'error': 'salary_min должен быть целым числом'}), 400
+
+    def build_payload():
+        page = paginate_vacancies(request.args, options=[joinedload(Vacancy.company)])
+        return {
+            'items': [vacancy_to_dict(vacancy) for vacancy in page],
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+            'total': page.total,
+        }
+
+    return conditional_json(build_payload)
+
+
+@api.route('/api/vacancies/batch')
+def batch_vacancies():
+    # ids=1,2,3 или ids=1&ids=2
+    ids = parse_ids(value for raw in request.args.getlist('ids') for value in raw.split(','))
+    if not ids:
+        return jsonify({'error': 'Передайте id вакансий в параметре ids'}), 400
+    if len(ids) > MAX_BATCH_IDS:
+        return jsonify({'error': f'Не больше {MAX_BATCH_IDS} id за запрос'}), 400
+
+    def build_payload():
+        vacancies = Vacancy.query.options(joinedload(Vacancy.company)).filter(
+            Vacancy.id.in_(ids),
+            Vacancy.is_active == True,
+            Vacancy.is_approved == True
+        ).all()
+        by_id = {vacancy.id: vacancy for vacancy in vacancies}
+        return {
+            'items': [vacancy_to_dict(by_id[vacancy_id]) for vacancy_id in ids if vacancy_id in by_id],
+            'missing': [vacancy_id for vacancy_id in ids if vacancy_id not in by_id],
+        }
+
+    return conditional_json(build_payload)
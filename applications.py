@@ -0,0 +1,48 @@
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, Application, Vacancy, Portfolio
+from counters import adjust_counters, adjust_vacancy_counters, TOTAL_COUNTERS, STATUS_COUNTERS
+
+# Результаты отклика, кроме успешного
+ALREADY_APPLIED = 'already_applied'
+VACANCY_UNAVAILABLE = 'vacancy_unavailable'
+NO_PORTFOLIO = 'no_portfolio'
+
+
+def apply_to_vacancy(vacancy_id, seeker_id, portfolio_id, cover_letter=None):
+    """
+    Отклик одним оператором INSERT ... SELECT ... ON CONFLICT DO NOTHING: строка появляется,
+    только если вакансия активна и одобрена, портфолио принадлежит соискателю и отклика
+    ещё нет. Повторный отклик (двойной клик, параллельные запросы) упирается в уникальный
+    индекс (vacancy_id, seeker_id) вместо проверки "прочитать, затем вставить".
+    Возвращает id отклика или None; изменения фиксирует вызывающий код.
+    """
+    source = (db.select(Vacancy.id, db.literal(seeker_id), Vacancy.employer_id, Portfolio.id,
+                        db.literal(cover_letter, db.Text))
+              .join(Portfolio, db.and_(Portfolio.id == portfolio_id, Portfolio.user_id == seeker_id))
+              .where(Vacancy.id == vacancy_id,
+                     Vacancy.is_active == db.true(),
+                     Vacancy.is_approved == db.true()))
+    # status и created_at подставляются из значений по умолчанию модели
+    stmt = (insert(Application.__table__)
+            .from_select(['vacancy_id', 'seeker_id', 'employer_id', 'portfolio_id', 'cover_letter'], source)
+            .on_conflict_do_nothing(index_elements=['vacancy_id', 'seeker_id'])
+            .returning(Application.__table__.c.id))
+    application_id = db.session.execute(stmt).scalar()
+    if application_id is None:
+        return None
+
+    # Оператор идёт в обход ORM-событий, поэтому счётчики обновляем явно в той же транзакции
+    connection = db.session.connection()
+    adjust_counters(connection, {TOTAL_COUNTERS[Application]: 1})
+    adjust_vacancy_counters(connection, {vacancy_id: {'applications_count': 1, STATUS_COUNTERS['pending']: 1}})
+    return application_id
+
+
+def apply_failure_reason(vacancy_id, seeker_id, portfolio_id):
+    """Почему отклик не создан; вызывается только после неудачной вставки"""
+    if db.session.query(Application.id).filter_by(vacancy_id=vacancy_id, seeker_id=seeker_id).first():
+        return ALREADY_APPLIED
+    if not db.session.query(Portfolio.id).filter_by(id=portfolio_id, user_id=seeker_id).first():
+        return NO_PORTFOLIO
+    return VACANCY_UNAVAILABLE
@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import Blueprint, current_app, request, send_from_directory, url_for, abort
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него собираются только .gz
+    brotli = None
+
+# Собранные файлы лежат в static/dist и отдаются по /assets/<имя с хэшем>
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_EXTENSIONS = ('.css', '.js')
+HASH_LENGTH = 10
+# Имя меняется вместе с содержимым, поэтому браузер может не перепроверять файл год
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Варианты в порядке предпочтения: (Content-Encoding, суффикс файла)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_SPACES_RE = re.compile(r'\s+')
+CSS_PUNCTUATION_RE = re.compile(r'\s*([{};,>])\s*')
+
+assets = Blueprint('assets', __name__)
+
+
+def minify_css(text):
+    text = CSS_COMMENT_RE.sub('', text)
+    text = CSS_SPACES_RE.sub(' ', text)
+    # Пробелы вокруг ':' не трогаем: в селекторах "a :hover" и "a:hover" различаются
+    text = CSS_PUNCTUATION_RE.sub(r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # Консервативно: только отступы, пустые строки и комментарии во всю строку.
+    # Переводы строк сохраняются, поэтому автоматическая расстановка ';' не ломается
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+def dist_folder(static_folder):
+    return os.path.join(static_folder, DIST_DIR)
+
+
+def _sources(static_folder):
+    dist = dist_folder(static_folder)
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(dist):
+            dirs[:] = []
+            continue
+        for name in sorted(files):
+            if name.endswith(SOURCE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def build_assets(static_folder, clean=False):
+    """
+    Минифицирует CSS/JS из static, пишет файлы с хэшем содержимого в имени, рядом .gz и .br
+    и манифест "исходное имя -> собранное". Старые сборки остаются, пока страницы со ссылками
+    на них могут быть в кэшах; clean=True удаляет всё, чего нет в новом манифесте.
+    """
+    dist = dist_folder(static_folder)
+    manifest = {}
+    for logical_name, path in _sources(static_folder):
+        base, extension = os.path.splitext(logical_name)
+        with open(path, encoding='utf-8') as file:
+            data = MINIFIERS[extension](file.read()).encode('utf-8')
+
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        built_name = f'{base}.{digest}{extension}'
+        built_path = os.path.join(dist, built_name)
+        _write(built_path, data)
+        # mtime=0 - одинаковое содержимое даёт побайтно одинаковый архив
+        _write(built_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(built_path + '.br', brotli.compress(data, quality=11))
+        manifest[logical_name] = built_name
+
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+    if clean:
+        keep = {MANIFEST_NAME}
+        for built_name in manifest.values():
+            keep.update(built_name + suffix for suffix in ('', '.gz', '.br'))
+        for root, _, files in os.walk(dist):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.relpath(path, dist).replace(os.sep, '/') not in keep:
+                    os.remove(path)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(dist_folder(static_folder), MANIFEST_NAME), encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _manifest():
+    # В режиме отладки перечитываем манифест, чтобы пересборка была видна без перезапуска
+    if current_app.debug:
+        return load_manifest(current_app.static_folder)
+    return current_app.extensions['assets_manifest']
+
+
+def asset_url(filename):
+    """URL собранного файла по манифесту; без сборки - обычный файл из static"""
+    built_name = _manifest().get(filename)
+    if built_name is None:
+        return url_for('static', filename=filename)
+    return url_for('assets.asset', filename=built_name)
+
+
+@assets.route('/assets/<path:filename>')
+def asset(filename):
+    directory = dist_folder(current_app.static_folder)
+    if filename == MANIFEST_NAME:
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in ENCODINGS:
+        variant = safe_join(directory, filename + suffix)
+        if request.accept_encodings[encoding] and variant and os.path.isfile(variant):
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype,
+                                           max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    app.extensions['assets_manifest'] = load_manifest(app.static_folder)
+    app.register_blueprint(assets)
+    app.add_template_global(asset_url)
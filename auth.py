@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from models import User, Company, Portfolio, db
+from throttling import login_throttle, Overloaded, PASSWORD_METHOD
 import re
 import html
 
@@ -59,14 +60,25 @@ def login():
             flash('Заполните все обязательные поля')
             return redirect(url_for('auth.login'))
 
+        # Лимиты проверяются до запроса к базе и вычисления хэша
+        throttle = login_throttle()
+        retry_after = throttle.check(request.remote_addr, email)
+        if retry_after:
+            flash('Слишком много попыток входа. Попробуйте позже.')
+            return render_template('auth/login.html'), 429, {'Retry-After': str(retry_after)}
+
         user = User.query.filter_by(email=email).first()
 
-        if not user:
-            flash('Пользователь с таким email не найден')
-            return redirect(url_for('auth.login'))
+        # Для неизвестного email хэш тоже вычисляется, а сообщение одинаковое:
+        # ни по ответу, ни по времени нельзя понять, есть ли такой пользователь
+        try:
+            valid = throttle.verify(user, password)
+        except Overloaded:
+            flash('Сервис перегружен. Повторите вход через несколько секунд.')
+            return render_template('auth/login.html'), 503, {'Retry-After': '5'}
 
-        if not check_password_hash(user.password, password):
-            flash('Неверный пароль')
+        if not valid:
+            flash('Неверный email или пароль')
             return redirect(url_for('auth.login'))
 
         if not user.is_active:
@@ -135,7 +147,7 @@ def register():
         new_user = User(
             email=email,
             name=name,
-            password=generate_password_hash(password, method='pbkdf2:sha256'),
+            password=generate_password_hash(password, method=PASSWORD_METHOD),
             role=role
         )
 
@@ -0,0 +1,206 @@
+"""
+Детерминированный генератор синтетических данных для нагрузочных замеров.
+
+    python benchmarks/generate.py                                   # небольшая база по умолчанию
+    python benchmarks/generate.py --users 1000000 --companies 100000 \\
+        --vacancies 500000 --applications 5000000                   # масштаб продакшена
+
+Одинаковые параметры и --seed дают одинаковую базу. Строки вставляются пачками
+через executemany в обход ORM, поэтому после вставки отдельно пересчитываются
+счётчики и строится поисковый индекс.
+
+Пароль у всех сгенерированных пользователей - BENCH_PASSWORD, администратор - из commands.ADMIN_ACCOUNT.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import text  # noqa: E402
+
+DEFAULT_DATABASE = os.path.join(ROOT, 'benchmarks', 'bench.db')
+BENCH_PASSWORD = 'Password123!'
+BATCH_SIZE = 10000
+
+TITLES = ['Python-разработчик', 'Java-разработчик', 'Frontend-разработчик', 'Аналитик данных',
+          'DevOps-инженер', 'Тестировщик', 'Дизайнер интерфейсов', 'Продуктовый менеджер',
+          'Android-разработчик', 'iOS-разработчик', 'Системный администратор', 'Data Scientist']
+SKILLS = ['Python', 'Django', 'Flask', 'SQL', 'PostgreSQL', 'Java', 'Spring', 'JavaScript', 'React',
+          'Vue', 'Docker', 'Kubernetes', 'Linux', 'Git', 'Figma', 'Kotlin', 'Swift', 'Pandas', 'C++', 'Go']
+INDUSTRIES = ['IT', 'Финансы', 'Ритейл', 'Телеком', 'Образование', 'Медицина', 'Логистика']
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Екатеринбург', 'Удалённо']
+EMPLOYMENT_TYPES = ['full-time', 'part-time', 'remote', 'project']
+EXPERIENCE_LEVELS = ['junior', 'middle', 'senior', 'lead']
+STATUSES = ['pending', 'pending', 'reviewed', 'accepted', 'rejected']
+
+EPOCH = datetime(2024, 1, 1)
+
+
+def employer_email(number):
+    return f'employer{number}@bench.local'
+
+
+def seeker_email(number):
+    return f'seeker{number}@bench.local'
+
+
+def batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_rows(conn, table, rows, label):
+    started = time.perf_counter()
+    total = 0
+    for batch in batches(rows):
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+    conn.commit()
+    print(f"{label}: {total} за {time.perf_counter() - started:.1f} с")
+
+
+def moment(rng, spread_days=600):
+    return EPOCH + timedelta(seconds=rng.randrange(spread_days * 86400))
+
+
+def generate(conn, args):
+    from werkzeug.security import generate_password_hash
+    from models import User, Company, Portfolio, Vacancy, Application
+    from commands import ADMIN_ACCOUNT, hash_password
+
+    rng = random.Random(args.seed)
+    # Один хеш на всех: генерация миллиона pbkdf2 заняла бы часы
+    password = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256')
+
+    employers = args.companies
+    seekers = max(args.users - employers - 1, 1)
+    vacancies = args.vacancies
+    portfolios = min(args.portfolios if args.portfolios is not None else seekers, seekers)
+    applications = min(args.applications, portfolios * vacancies)
+
+    # id назначаются явно: 1 - администратор, затем работодатели, затем соискатели
+    email, admin_password, name = ADMIN_ACCOUNT
+    first_employer, first_seeker = 2, 2 + employers
+
+    def users():
+        yield {'id': 1, 'email': email, 'password': hash_password(admin_password), 'name': name,
+               'role': 'admin', 'is_active': True, 'created_at': EPOCH}
+        for number in range(employers):
+            yield {'id': first_employer + number, 'email': employer_email(number), 'password': password,
+                   'name': f'Работодатель {number}', 'role': 'employer', 'is_active': True,
+                   'created_at': moment(rng)}
+        for number in range(seekers):
+            yield {'id': first_seeker + number, 'email': seeker_email(number), 'password': password,
+                   'name': f'Соискатель {number}', 'role': 'seeker', 'is_active': True,
+                   'created_at': moment(rng)}
+
+    def companies():
+        for number in range(employers):
+            created = moment(rng)
+            yield {'id': number + 1, 'user_id': first_employer + number,
+                   'company_name': f'Компания {number}', 'industry': rng.choice(INDUSTRIES),
+                   'description': 'Синтетическая компания для замеров',
+                   # Каждая десятая компания ждёт модерации
+                   'is_approved': number % 10 != 0, 'created_at': created, 'updated_at': created}
+
+    def portfolio_rows():
+        for number in range(portfolios):
+            created = moment(rng)
+            yield {'id': number + 1, 'user_id': first_seeker + number,
+                   'title': f'Портфолио {number}', 'profession': rng.choice(TITLES),
+                   'skills': ', '.join(rng.sample(SKILLS, 4)), 'experience_years': rng.randrange(15),
+                   'is_public': True, 'is_approved': number % 20 != 0,
+                   'created_at': created, 'updated_at': created}
+
+    def vacancy_rows():
+        for number in range(vacancies):
+            company = number % employers
+            salary_min = rng.randrange(30, 300) * 1000
+            created = moment(rng)
+            yield {'id': number + 1, 'employer_id': first_employer + company, 'company_id': company + 1,
+                   'title': rng.choice(TITLES),
+                   'description': 'Разработка и поддержка сервисов компании',
+                   'requirements': ', '.join(rng.sample(SKILLS, 5)),
+                   'salary_min': salary_min, 'salary_max': salary_min + rng.randrange(0, 200) * 1000,
+                   'employment_type': rng.choice(EMPLOYMENT_TYPES),
+                   'experience_level': rng.choice(EXPERIENCE_LEVELS),
+                   'location': rng.choice(CITIES),
+                   'is_active': number % 25 != 0, 'is_approved': number % 15 != 0,
+                   'created_at': created, 'updated_at': created}
+
+    def application_rows():
+        # Пары (вакансия, соискатель) не повторяются: k-й отклик соискателя идёт на вакансию со сдвигом k
+        for number in range(applications):
+            portfolio, round_number = number % portfolios, number // portfolios
+            vacancy = (portfolio * 7919 + round_number) % vacancies
+            yield {'id': number + 1, 'vacancy_id': vacancy + 1, 'seeker_id': first_seeker + portfolio,
+                   'employer_id': first_employer + vacancy % employers,
+                   'portfolio_id': portfolio + 1, 'status': rng.choice(STATUSES), 'created_at': moment(rng)}
+
+    insert_rows(conn, User.__table__, users(), 'Пользователи')
+    insert_rows(conn, Company.__table__, companies(), 'Компании')
+    insert_rows(conn, Portfolio.__table__, portfolio_rows(), 'Портфолио')
+    insert_rows(conn, Vacancy.__table__, vacancy_rows(), 'Вакансии')
+    insert_rows(conn, Application.__table__, application_rows(), 'Отклики')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генерация синтетической базы для замеров')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--companies', type=int, default=2000)
+    parser.add_argument('--vacancies', type=int, default=10000)
+    parser.add_argument('--portfolios', type=int, default=None, help='по умолчанию у каждого соискателя')
+    parser.add_argument('--applications', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.companies < 1 or args.vacancies < 1 or args.users <= args.companies:
+        parser.error('нужна хотя бы одна компания и вакансия, пользователей больше, чем компаний')
+
+    if os.path.exists(args.database):
+        os.remove(args.database)
+
+    from app import create_app
+    from models import db
+    from migrations import run_migrations
+    from search import rebuild_search_index
+    from counters import reconcile_counters, check_application_consistency
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.database)}'})
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+
+        with db.engine.connect() as conn:
+            # База одноразовая: надёжность записи не нужна, нужна скорость
+            conn.execute(text('PRAGMA synchronous = OFF'))
+            conn.execute(text('PRAGMA journal_mode = MEMORY'))
+            generate(conn, args)
+
+            print("Строим поисковый индекс...")
+            rebuild_search_index(conn, commit=True)
+            reconcile_counters(conn)
+            # Отклики вставлены в обход ORM - счётчики вакансий считаем одним проходом
+            check_application_consistency(conn, fix=True)
+            conn.commit()
+            conn.execute(text('ANALYZE'))
+            conn.commit()
+
+    print(f"Готово: {args.database} за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+Замер маршрутов через тестовый клиент Flask на базе из benchmarks/generate.py.
+
+    python benchmarks/generate.py                   # один раз подготовить базу
+    python benchmarks/routes.py                     # замер и сравнение с baseline
+    python benchmarks/routes.py --update-baseline
+    python benchmarks/routes.py --concurrency 8 --duration 30   # плюс нагрузочный прогон
+
+Для каждого сценария печатаются p50/p95/p99, пропускная способность и число SQL-запросов
+на запрос. Завершается с кодом 1, если p95 хуже базовой линии больше чем на --tolerance
+или маршрут стал делать больше запросов.
+
+Сценарий apply создаёт отклики, а login намеренно медленный (pbkdf2), поэтому
+замеры лучше гонять на одноразовой сгенерированной базе.
+"""
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event  # noqa: E402
+
+from generate import DEFAULT_DATABASE, BENCH_PASSWORD, employer_email, seeker_email  # noqa: E402
+from startup import load_baseline, save_baseline  # noqa: E402
+
+# Фильтры публичного списка: все сочетания, которые встречаются в логах
+VACANCY_FILTERS = [
+    {},
+    {'search': 'python'},
+    {'search': 'python', 'sort': 'relevance'},
+    {'experience': 'senior'},
+    {'employment_type': 'remote'},
+    {'salary_min': '150000'},
+    {'sort': 'salary_high'},
+    {'experience': 'middle', 'employment_type': 'full-time', 'sort': 'salary_low'},
+    {'search': 'react', 'experience': 'junior', 'salary_min': '50000'},
+]
+
+
+class QueryCounter:
+    """Считает SQL-запросы отдельно для каждого потока"""
+
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+class Scenario:
+    def __init__(self, name, role, method, url, data=None):
+        self.name = name
+        self.role = role
+        self.method = method
+        # url - строка или функция от номера итерации
+        self.url = url
+        self.data = data
+
+    def request(self, client, iteration):
+        url = self.url(iteration) if callable(self.url) else self.url
+        data = self.data(iteration) if callable(self.data) else self.data
+        return client.open(url, method=self.method, data=data)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def build_scenarios(app):
+    """Маршруты всех blueprint'ов с параметрами из сгенерированной базы"""
+    from urllib.parse import urlencode
+    from models import Vacancy
+
+    with app.app_context():
+        vacancy_ids = [row[0] for row in Vacancy.query.with_entities(Vacancy.id).filter_by(
+            is_active=True, is_approved=True).order_by(Vacancy.id.desc()).limit(5000)]
+
+    scenarios = [
+        Scenario('index', None, 'GET', '/'),
+        Scenario('login', None, 'POST', '/login',
+                 data=lambda i: {'email': seeker_email(i % 100), 'password': BENCH_PASSWORD}),
+    ]
+    for number, filters in enumerate(VACANCY_FILTERS):
+        url = '/vacancies' + ('?' + urlencode(filters) if filters else '')
+        scenarios.append(Scenario(f'vacancies[{number}]', None, 'GET', url))
+    scenarios += [
+        Scenario('api.vacancies', None, 'GET', '/api/vacancies?sort=salary_high'),
+        Scenario('seeker.dashboard', 'seeker', 'GET', '/seeker/dashboard'),
+        Scenario('seeker.apply', 'seeker', 'POST',
+                 lambda i: f'/seeker/apply/{vacancy_ids[i % len(vacancy_ids)]}',
+                 data={'cover_letter': 'Здравствуйте!'}),
+        Scenario('employer.dashboard', 'employer', 'GET', '/employer/dashboard'),
+        Scenario('admin.dashboard', 'admin', 'GET', '/admin'),
+        Scenario('admin.users', 'admin', 'GET', '/admin/users?sort=created_at&order=desc'),
+        Scenario('admin.vacancies', 'admin', 'GET', '/admin/vacancies?sort=updated_at&order=desc'),
+        Scenario('admin.portfolios', 'admin', 'GET', '/admin/portfolios'),
+        Scenario('admin.companies', 'admin', 'GET', '/admin/companies?sort=company_name'),
+    ]
+    return scenarios
+
+
+def make_clients(app):
+    """Тестовые клиенты, уже вошедшие под каждой ролью"""
+    from commands import ADMIN_ACCOUNT
+
+    accounts = {
+        None: None,
+        'seeker': (seeker_email(1), BENCH_PASSWORD),
+        'employer': (employer_email(1), BENCH_PASSWORD),
+        'admin': ADMIN_ACCOUNT[:2],
+    }
+    clients = {}
+    for role, account in accounts.items():
+        client = app.test_client()
+        if account:
+            response = client.post('/login', data={'email': account[0], 'password': account[1]})
+            if response.status_code != 302:
+                raise SystemExit(f'Не удалось войти как {role}: {account[0]}')
+        clients[role] = client
+    return clients
+
+
+def run_sequential(app, scenarios, counter, runs, warmup):
+    clients = make_clients(app)
+    results = {}
+    for scenario in scenarios:
+        runs_for = max(3, runs // 10) if scenario.name == 'login' else runs
+        client = app.test_client() if scenario.role is None else clients[scenario.role]
+        for iteration in range(warmup):
+            scenario.request(client, iteration)
+
+        timings, queries = [], []
+        started = time.perf_counter()
+        for iteration in range(warmup, warmup + runs_for):
+            counter.reset()
+            begin = time.perf_counter()
+            response = scenario.request(client, iteration)
+            timings.append((time.perf_counter() - begin) * 1000)
+            queries.append(counter.count)
+            if response.status_code >= 500:
+                raise SystemExit(f'{scenario.name}: HTTP {response.status_code}')
+        elapsed = time.perf_counter() - started
+
+        results[scenario.name] = {
+            'p50': round(percentile(timings, 0.50), 2),
+            'p95': round(percentile(timings, 0.95), 2),
+            'p99': round(percentile(timings, 0.99), 2),
+            'rps': round(runs_for / elapsed, 1),
+            'queries': statistics.median(queries),
+        }
+    return results
+
+
+def run_load(app, scenarios, concurrency, duration):
+    """Несколько потоков со своими клиентами крутят сценарии по кругу заданное время"""
+    scenarios = [scenario for scenario in scenarios if scenario.name != 'login']
+    timings = []
+    errors = []
+    lock = threading.Lock()
+    # Вход под всеми ролями (pbkdf2) не должен съедать время прогона: стартуем вместе
+    window = {}
+
+    def start_clock():
+        window['started'] = time.perf_counter()
+        window['deadline'] = window['started'] + duration
+
+    ready = threading.Barrier(concurrency + 1, action=start_clock)
+
+    def worker(offset):
+        clients = make_clients(app)
+        ready.wait()
+        local = []
+        for iteration in itertools.count(offset * 100000):
+            if time.perf_counter() >= window['deadline']:
+                break
+            scenario = scenarios[iteration % len(scenarios)]
+            client = clients[scenario.role]
+            begin = time.perf_counter()
+            try:
+                response = scenario.request(client, iteration)
+                if response.status_code >= 500:
+                    raise RuntimeError(f'{scenario.name}: HTTP {response.status_code}')
+            except Exception as exc:
+                with lock:
+                    errors.append(str(exc))
+                continue
+            local.append((time.perf_counter() - begin) * 1000)
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - window['started']
+
+    if not timings:
+        return {'requests': 0, 'errors': len(errors)}
+    return {
+        'requests': len(timings),
+        'errors': len(errors),
+        'rps': round(len(timings) / elapsed, 1),
+        'p50': round(percentile(timings, 0.50), 2),
+        'p95': round(percentile(timings, 0.95), 2),
+        'p99': round(percentile(timings, 0.99), 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        limit = previous['p95'] * (1 + tolerance)
+        if current['p95'] > limit:
+            regressions.append(f"{name}: p95 {current['p95']} ms > {limit:.2f} ms (baseline {previous['p95']} ms)")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: запросов {current['queries']} > {previous['queries']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер маршрутов приложения')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', help='подстрока имени сценария')
+    parser.add_argument('--concurrency', type=int, default=0, help='потоков нагрузочного прогона, 0 - без него')
+    parser.add_argument('--duration', type=float, default=10.0, help='длительность нагрузочного прогона, с')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое ухудшение p95, доля')
+    parser.add_argument('--no-page-cache', action='store_true', help='мерить без кэша страниц для анонимов')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        raise SystemExit(f'Нет базы {args.database}, сначала запустите benchmarks/generate.py')
+
+    from app import create_app
+    from models import db
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.database)}',
+        'PAGE_CACHE_ENABLED': not args.no_page_cache,
+        # Все сценарии идут с одного адреса: лимиты входа мерили бы сами себя
+        'LOGIN_THROTTLE_ENABLED': False,
+    })
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    scenarios = build_scenarios(app)
+    if args.only:
+        scenarios = [scenario for scenario in scenarios if args.only in scenario.name]
+
+    results = run_sequential(app, scenarios, counter, args.runs, args.warmup)
+    print(f"{'сценарий':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>9}{'SQL':>6}")
+    for name, row in results.items():
+        print(f"{name:<22}{row['p50']:>9}{row['p95']:>9}{row['p99']:>9}{row['rps']:>9}{row['queries']:>6}")
+
+    if args.concurrency:
+        load = run_load(app, scenarios, args.concurrency, args.duration)
+        print(f"\nНагрузка, {args.concurrency} потоков, {args.duration} с: {load}")
+
+    baseline = load_baseline()
+    if args.update_baseline:
+        baseline.setdefault('routes', {}).update(results)
+        save_baseline(baseline)
+        print("Базовая линия сохранена")
+        return 0
+
+    if 'routes' not in baseline:
+        print("Базовая линия не найдена, запустите с --update-baseline")
+        return 0
+
+    regressions = compare(results, baseline['routes'], args.tolerance)
+    for line in regressions:
+        print(f"Регрессия: {line}")
+    if regressions:
+        return 1
+    print("OK: регрессий нет")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Замер холодного старта: импорт модуля app и создание приложения в свежем процессе.
+
+    python benchmarks/startup.py                  # замер и сравнение с baseline
+    python benchmarks/startup.py --update-baseline
+
+Завершается с кодом 1, если медиана хуже сохранённой базовой линии больше чем на --tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# Код, который выполняется в дочернем процессе; время считается внутри него,
+# чтобы не учитывать запуск самого интерпретатора
+PROBE = (
+    "import time; start = time.perf_counter(); "
+    "import app; app.create_app(); "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def measure(runs):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(data):
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время холодного старта приложения')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое ухудшение, доля')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    timings = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"startup: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms")
+
+    baseline = load_baseline()
+    if args.update_baseline:
+        baseline['startup_ms'] = round(median, 1)
+        save_baseline(baseline)
+        print(f"Базовая линия сохранена: {baseline['startup_ms']} ms")
+        return 0
+
+    if 'startup_ms' not in baseline:
+        print("Базовая линия не найдена, запустите с --update-baseline")
+        return 0
+
+    limit = baseline['startup_ms'] * (1 + args.tolerance)
+    if median > limit:
+        print(f"Регрессия: {median:.1f} ms > {limit:.1f} ms (baseline {baseline['startup_ms']} ms)")
+        return 1
+    print(f"OK: не хуже {limit:.1f} ms (baseline {baseline['startup_ms']} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+from sqlalchemy import func
+
+from models import db, Company, Portfolio, Vacancy, Application
+from counters import adjust_counters, release_vacancy_counters, PENDING_COUNTERS, TOTAL_COUNTERS
+from page_cache import invalidate_listings
+from search import remove_from_index
+from ranking import delete_scores
+
+# Размер пачки для UPDATE/DELETE ... WHERE id IN (...): ниже лимита переменных SQLite
+CHUNK_SIZE = 500
+
+# Модели, которые проходят модерацию
+MODERATED_MODELS = {
+    'vacancies': Vacancy,
+    'portfolios': Portfolio,
+    'companies': Company,
+}
+
+
+def chunked(ids, size=CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def parse_ids(values):
+    """Список id из формы, без мусора и повторов"""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return sorted(ids)
+
+
+def matching_ids(model, *criteria, chunk_size=CHUNK_SIZE):
+    """Все id строк, подходящих под фильтр, выбранные keyset-проходом пачками"""
+    ids = []
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            db.select(model.id).where(model.id > last_id, *criteria).order_by(model.id).limit(chunk_size)
+        ).scalars().all()
+        if not batch:
+            return ids
+        ids.extend(batch)
+        last_id = batch[-1]
+
+
+def _execute(statement):
+    return db.session.execute(statement, execution_options={'synchronize_session': False}).rowcount
+
+
+def _connection():
+    return db.session.connection()
+
+
+def set_approval(model, ids, approved):
+    """Одобряет или отклоняет строки; меняет только те, у которых статус действительно другой"""
+    affected = 0
+    for chunk in chunked(ids):
+        affected += _execute(
+            db.update(model)
+            .where(model.id.in_(chunk), model.is_approved == (not approved))
+            .values(is_approved=approved)
+        )
+
+    if affected:
+        adjust_counters(_connection(), {PENDING_COUNTERS[model]: -affected if approved else affected})
+        if model in (Vacancy, Company):
+            invalidate_listings(_connection())
+    return affected
+
+
+def set_vacancies_active(ids, active=None):
+    """Включает/выключает вакансии. active=None переключает текущее состояние каждой"""
+    affected = 0
+    for chunk in chunked(ids):
+        statement = db.update(Vacancy).where(Vacancy.id.in_(chunk))
+        if active is None:
+            statement = statement.values(is_active=db.not_(func.coalesce(Vacancy.is_active, False)))
+        else:
+            statement = statement.where(Vacancy.is_active != active).values(is_active=active)
+        affected += _execute(statement)
+
+    if affected:
+        invalidate_listings(_connection())
+    return affected
+
+
+def _count_pending(model, chunk):
+    return db.session.execute(
+        db.select(func.count()).select_from(model).where(model.id.in_(chunk), model.is_approved == db.false())
+    ).scalar()
+
+
+def _delete_applications(column, chunk, vacancy_counters=True):
+    delete_scores(db.select(Application.id).where(column.in_(chunk)))
+    # Счётчики вакансий, которые удаляются вместе с откликами, поддерживать незачем
+    if vacancy_counters:
+        release_vacancy_counters(_connection(), column.in_(chunk))
+    deleted = _execute(db.delete(Application).where(column.in_(chunk)))
+    if deleted:
+        adjust_counters(_connection(), {TOTAL_COUNTERS[Application]: -deleted})
+    return deleted
+
+
+def delete_applications(ids):
+    """Удаляет отклики по id"""
+    affected = 0
+    for chunk in chunked(ids):
+        affected += _delete_applications(Application.id, chunk)
+    return affected
+
+
+def _delete_rows(model, chunk):
+    pending = _count_pending(model, chunk) if model in PENDING_COUNTERS else 0
+    deleted = _execute(db.delete(model).where(model.id.in_(chunk)))
+    deltas = {PENDING_COUNTERS[model]: -pending} if pending else {}
+    if model in TOTAL_COUNTERS:
+        deltas[TOTAL_COUNTERS[model]] = -deleted
+    adjust_counters(_connection(), deltas)
+    return deleted
+
+
+def delete_vacancies(ids):
+    """Удаляет вакансии вместе с откликами набором DELETE ... WHERE id IN (...)"""
+    affected = 0
+    for chunk in chunked(ids):
+        _delete_applications(Application.vacancy_id, chunk, vacancy_counters=False)
+        remove_from_index(_connection(), chunk)
+        affected += _delete_rows(Vacancy, chunk)
+        # Индекс рекомендаций этого процесса чистится после коммита, остальных - сверкой
+        # при смене поколения списков (см. recommendations.py)
+        db.session.info.setdefault('deleted_vacancy_ids', []).extend(chunk)
+
+    if affected:
+        invalidate_listings(_connection())
+    return affected
+
+
+def delete_portfolios(ids):
+    """Удаляет портфолио вместе с откликами, поданными с ними"""
+    affected = 0
+    for chunk in chunked(ids):
+        _delete_applications(Application.portfolio_id, chunk)
+        affected += _delete_rows(Portfolio, chunk)
+    return affected
+
+
+def delete_companies(ids):
+    """Удаляет компании, их вакансии и отклики на эти вакансии"""
+    affected = 0
+    for chunk in chunked(ids):
+        delete_vacancies(matching_ids(Vacancy, Vacancy.company_id.in_(chunk)))
+        affected += _delete_rows(Company, chunk)
+
+    if affected:
+        invalidate_listings(_connection())
+    return affected
+
+
+DELETE_HANDLERS = {
+    Vacancy: delete_vacancies,
+    Portfolio: delete_portfolios,
+    Company: delete_companies,
+}
@@ -0,0 +1,147 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from models import db, User
+from counters import reconcile_counters, check_application_consistency
+from migrations import run_migrations
+from deletions import resume_unfinished_tasks
+from notifications import drain_outbox, run_outbox_worker, WORKER_INTERVAL
+from assets import build_assets, brotli
+
+ADMIN_ACCOUNT = ('admin@admin.com', 'Admin123!', 'Administrator')
+
+# Тестовые пользователи из демо-базы: (email, пароль)
+TEST_ACCOUNTS = [
+    ('alex.ivanov@mail.ru', 'Password123!'),
+    ('maria.petrova@gmail.com', 'Password123!'),
+    ('sergey.smirnov@yandex.ru', 'Password123!'),
+    ('ekaterina.volkova@mail.ru', 'Password123!'),
+    ('hr@techcompany.ru', 'Password123!'),
+    ('careers@webstudio.com', 'Password123!'),
+    ('jobs@fintech.org', 'Password123!'),
+]
+
+
+def hash_password(password):
+    return generate_password_hash(password, method='pbkdf2:sha256')
+
+
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Создаёт недостающие таблицы и применяет миграции схемы"""
+    db.create_all()
+    applied = run_migrations(db.engine)
+    print(f"Применено миграций: {len(applied)}" if applied else "Схема базы данных актуальна")
+
+
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """Создаёт администратора, если его ещё нет. Повторный запуск ничего не меняет"""
+    email, password, name = ADMIN_ACCOUNT
+    if User.query.filter_by(email=email).first():
+        print("Администратор уже существует")
+        return
+
+    db.session.add(User(email=email, password=hash_password(password), name=name, role='admin'))
+    db.session.commit()
+    print(f"Администратор создан: {email} / {password}")
+
+
+@click.command('reset-passwords')
+@click.option('--force', is_flag=True, help='Перехешировать пароли, даже если они уже совпадают')
+@with_appcontext
+def reset_passwords_command(force):
+    """Возвращает администратору и тестовым пользователям пароли из демо-набора"""
+    accounts = [(ADMIN_ACCOUNT[0], ADMIN_ACCOUNT[1])] + TEST_ACCOUNTS
+    users = {user.email: user for user in User.query.filter(User.email.in_([email for email, _ in accounts]))}
+
+    changed = 0
+    for email, password in accounts:
+        user = users.get(email)
+        if not user:
+            continue
+        # Строку не перезаписываем, если пароль уже правильный
+        if not force and check_password_hash(user.password, password):
+            continue
+        user.password = hash_password(password)
+        changed += 1
+        print(f"Пароль для {email} обновлен: {password}")
+
+    db.session.commit()
+    print(f"Обновлено паролей: {changed}")
+
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters_command():
+    """Пересчитывает счётчики статистики админ-панели с нуля"""
+    with db.engine.begin() as conn:
+        values = reconcile_counters(conn)
+    for name, value in values.items():
+        print(f"{name}: {value}")
+
+
+@click.command('resume-deletions')
+@with_appcontext
+def resume_deletions_command():
+    """Доводит до конца фоновые удаления, прерванные остановкой сервера"""
+    for task in resume_unfinished_tasks():
+        print(f"Задача #{task.id} ({task.target_type} {task.target_id}): {task.status}, "
+              f"удалено откликов {task.deleted_applications}, вакансий {task.deleted_vacancies}")
+
+
+@click.command('outbox-worker')
+@click.option('--once', is_flag=True, help='Разобрать очередь один раз и выйти')
+@click.option('--interval', default=WORKER_INTERVAL, show_default=True, help='Пауза между проходами, с')
+@with_appcontext
+def outbox_worker_command(once, interval):
+    """Отправляет письма из outbox с повторами при ошибках"""
+    if once:
+        sent, failed = drain_outbox()
+        print(f"Отправлено писем: {sent}, ошибок: {failed}")
+        return
+    print("Обработчик outbox запущен, Ctrl+C для остановки")
+    run_outbox_worker(current_app._get_current_object(), interval=interval)
+
+
+@click.command('check-applications')
+@click.option('--fix', is_flag=True, help='Исправить найденные расхождения')
+@with_appcontext
+def check_applications_command(fix):
+    """Сверяет счётчики откликов в вакансиях и employer_id откликов с реальными данными"""
+    with db.engine.begin() as conn:
+        vacancies, applications = check_application_consistency(conn, fix=fix)
+    print(f"Вакансий с неверными счётчиками: {vacancies}")
+    print(f"Откликов с неверным employer_id: {applications}")
+    if (vacancies or applications) and not fix:
+        print("Запустите с --fix, чтобы исправить")
+        raise SystemExit(1)
+
+
+@click.command('build-assets')
+@click.option('--clean', is_flag=True, help='Удалить прежние сборки, которых нет в новом манифесте')
+@with_appcontext
+def build_assets_command(clean):
+    """Минифицирует CSS/JS, добавляет хэш содержимого в имена и сжимает их заранее"""
+    manifest = build_assets(current_app.static_folder, clean=clean)
+    for logical_name, built_name in sorted(manifest.items()):
+        print(f"{logical_name} -> {built_name}")
+    if brotli is None:
+        print("Модуль brotli не установлен, собраны только .gz")
+    print("Перезапустите приложение, чтобы оно прочитало новый манифест")
+
+
+COMMANDS = [
+    migrate_command,
+    seed_command,
+    reset_passwords_command,
+    reconcile_counters_command,
+    resume_deletions_command,
+    outbox_worker_command,
+    check_applications_command,
+    build_assets_command,
+]
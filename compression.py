@@ -0,0 +1,126 @@
+import zlib
+
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:  # без brotli ответы сжимаются только gzip
+    brotli = None
+
+# Меньшие ответы не сжимаем: выигрыш меньше накладных расходов
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# Уровень для сжатия на лету; заранее собранные файлы (assets.py) сжимаются максимально
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = {
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/x-ndjson',
+    'image/svg+xml',
+}
+
+
+class _GzipCompressor:
+    def __init__(self):
+        # wbits=31 - формат gzip с заголовком и контрольной суммой
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        # Синхронный сброс отдаёт клиенту всё накопленное, не завершая поток
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def process(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+COMPRESSORS = {
+    'br': _BrotliCompressor,
+    'gzip': _GzipCompressor,
+}
+
+
+def choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compressible(response):
+    return (200 <= response.status_code < 300
+            and response.status_code != 204
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in COMPRESSIBLE_TYPES
+            # Файлы отдаются как есть (send_file), статика уже сжата заранее
+            and not response.direct_passthrough)
+
+
+def _stream(chunks, compressor):
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(response):
+    if not _compressible(response):
+        return response
+    # Кэши между клиентом и сервером должны хранить варианты для разных Accept-Encoding
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # Потоковые ответы (выгрузки) сжимаются по мере генерации, размер заранее неизвестен
+        response.response = _stream(response.response, COMPRESSORS[encoding]())
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', MIN_SIZE):
+            return response
+        compressor = COMPRESSORS[encoding]()
+        response.set_data(compressor.process(data) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    # Сжатое представление побайтно отличается от исходного, но равнозначно ему
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Сжатие текстовых ответов; COMPRESS_ENABLED=False отключает его (например, за nginx с gzip)"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    app.after_request(compress_response)
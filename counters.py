@@ -0,0 +1,276 @@
+from sqlalchemy import event, func, case, or_, bindparam
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from models import db, User, Company, Portfolio, Vacancy, Application, StatCounter
+
+# Общее количество строк по моделям
+TOTAL_COUNTERS = {
+    User: 'users_count',
+    Company: 'companies_count',
+    Vacancy: 'vacancies_count',
+    Application: 'applications_count',
+}
+
+# Очереди модерации: количество строк с is_approved = False
+PENDING_COUNTERS = {
+    Vacancy: 'pending_vacancies',
+    Portfolio: 'pending_portfolios',
+    Company: 'pending_companies',
+}
+
+COUNTER_NAMES = list(TOTAL_COUNTERS.values()) + list(PENDING_COUNTERS.values())
+
+# Счётчики откликов в строке вакансии: общий и по статусам
+STATUS_COUNTERS = {
+    'pending': 'pending_count',
+    'reviewed': 'reviewed_count',
+    'accepted': 'accepted_count',
+    'rejected': 'rejected_count',
+}
+VACANCY_COUNTERS = ['applications_count'] + list(STATUS_COUNTERS.values())
+
+
+def _is_pending(value):
+    # Как и в исходном filter_by(is_approved=False): NULL в очередь не попадает
+    return value is False or value == 0
+
+
+def adjust_counters(connection, deltas):
+    """Атомарно прибавляет дельты к счётчикам в текущей транзакции"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    stmt = insert(StatCounter.__table__)
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[StatCounter.name],
+            set_={'value': StatCounter.__table__.c.value + stmt.excluded.value}
+        ),
+        [{'name': name, 'value': delta} for name, delta in deltas.items()]
+    )
+
+
+def get_counters():
+    """Все счётчики статистики одним запросом к маленькой таблице"""
+    values = dict(db.session.query(StatCounter.name, StatCounter.value).all())
+    return {name: values.get(name, 0) for name in COUNTER_NAMES}
+
+
+def reconcile_counters(connection):
+    """Пересчитывает все счётчики с нуля по реальным данным"""
+    values = {}
+    for model, name in TOTAL_COUNTERS.items():
+        values[name] = connection.execute(db.select(func.count()).select_from(model)).scalar()
+    for model, name in PENDING_COUNTERS.items():
+        values[name] = connection.execute(
+            db.select(func.count()).select_from(model).where(model.is_approved == db.false())
+        ).scalar()
+
+    connection.execute(StatCounter.__table__.delete().where(StatCounter.name.in_(COUNTER_NAMES)))
+    connection.execute(StatCounter.__table__.insert(),
+                       [{'name': name, 'value': value} for name, value in values.items()])
+    return values
+
+
+def counters_initialized(connection):
+    return connection.execute(
+        db.select(func.count()).select_from(StatCounter).where(StatCounter.name.in_(COUNTER_NAMES))
+    ).scalar() > 0
+
+
+def _application_deltas(status, sign):
+    deltas = {'applications_count': sign}
+    if status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[status]] = sign
+    return deltas
+
+
+def adjust_vacancy_counters(connection, deltas):
+    """
+    Прибавляет дельты {id вакансии: {счётчик: дельта}} к счётчикам откликов одним
+    пакетным UPDATE в текущей транзакции. updated_at вакансии не меняется: от него
+    зависят ETag API, индекс рекомендаций и актуальность оценок кандидатов.
+    """
+    rows = [dict({f'delta_{name}': changes.get(name, 0) for name in VACANCY_COUNTERS}, vacancy_id=vacancy_id)
+            for vacancy_id, changes in deltas.items() if any(changes.values())]
+    if not rows:
+        return
+
+    table = Vacancy.__table__
+    values = {name: table.c[name] + bindparam(f'delta_{name}') for name in VACANCY_COUNTERS}
+    connection.execute(
+        table.update().where(table.c.id == bindparam('vacancy_id')).values(updated_at=table.c.updated_at, **values),
+        rows
+    )
+
+
+def release_vacancy_counters(connection, condition):
+    """Вычитает из счётчиков вакансий отклики, выбранные условием (перед массовым удалением в обход ORM)"""
+    deltas = {}
+    for vacancy_id, status, count in connection.execute(
+        db.select(Application.vacancy_id, Application.status, func.count())
+        .where(condition)
+        .group_by(Application.vacancy_id, Application.status)
+    ):
+        changes = deltas.setdefault(vacancy_id, {})
+        for name, delta in _application_deltas(status, -count).items():
+            changes[name] = changes.get(name, 0) + delta
+    adjust_vacancy_counters(connection, deltas)
+
+
+def _actual_vacancy_counters():
+    columns = [func.count().label('applications_count')]
+    columns += [func.sum(case((Application.status == status, 1), else_=0)).label(name)
+                for status, name in STATUS_COUNTERS.items()]
+    return (db.select(Application.vacancy_id, *columns)
+            .group_by(Application.vacancy_id)
+            .subquery('actual'))
+
+
+def _count_applications(*conditions):
+    return (db.select(func.count())
+            .select_from(Application)
+            .where(Application.vacancy_id == Vacancy.id, *conditions)
+            .scalar_subquery())
+
+
+def _vacancy_employer():
+    return (db.select(Vacancy.employer_id)
+            .where(Vacancy.id == Application.vacancy_id)
+            .scalar_subquery())
+
+
+def check_application_consistency(connection, fix=False):
+    """
+    Сверяет денормализованные данные откликов с исходными: счётчики в vacancy и
+    application.employer_id. Возвращает (вакансий с расхождениями, откликов с неверным
+    employer_id); при fix=True исправляет их в текущей транзакции.
+    """
+    actual = _actual_vacancy_counters()
+    mismatched = (db.select(Vacancy.id)
+                  .outerjoin(actual, actual.c.vacancy_id == Vacancy.id)
+                  .where(or_(*[func.coalesce(actual.c[name], 0) != getattr(Vacancy, name)
+                               for name in VACANCY_COUNTERS])))
+    wrong_employer = or_(Application.employer_id.is_(None), Application.employer_id != _vacancy_employer())
+
+    vacancies = connection.execute(db.select(func.count()).select_from(mismatched.subquery())).scalar()
+    applications = connection.execute(
+        db.select(func.count()).select_from(Application).where(wrong_employer)
+    ).scalar()
+
+    if fix and vacancies:
+        # Пересчёт коррелированными COUNT по индексу (vacancy_id, ...) только для расходящихся строк
+        recount = {'applications_count': _count_applications()}
+        recount.update({name: _count_applications(Application.status == status)
+                        for status, name in STATUS_COUNTERS.items()})
+        connection.execute(
+            db.update(Vacancy).where(Vacancy.id.in_(mismatched)).values(updated_at=Vacancy.updated_at, **recount)
+        )
+    if fix and applications:
+        # Отклики на несуществующие вакансии пропускаем: employer_id для них взять неоткуда
+        connection.execute(
+            db.update(Application)
+            .where(wrong_employer, Application.vacancy_id.in_(db.select(Vacancy.id)))
+            .values(employer_id=_vacancy_employer())
+        )
+    return vacancies, applications
+
+
+@event.listens_for(Application, 'before_insert')
+def _fill_employer_id(mapper, connection, target):
+    """employer_id отклика берётся из вакансии в том же INSERT, без отдельного запроса"""
+    if target.employer_id is not None:
+        return
+    vacancy = target.__dict__.get('vacancy')
+    if vacancy is not None and vacancy.employer_id is not None:
+        target.employer_id = vacancy.employer_id
+    else:
+        target.employer_id = (db.select(Vacancy.employer_id)
+                              .where(Vacancy.id == target.vacancy_id)
+                              .scalar_subquery())
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_deleted_state(session, flush_context, instances):
+    """Подгружает is_approved и статус откликов у удаляемых объектов, пока строки ещё существуют"""
+    for obj in session.deleted:
+        if type(obj) in PENDING_COUNTERS:
+            obj.is_approved
+        if isinstance(obj, Application):
+            obj.vacancy_id, obj.status
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_counters(session, flush_context):
+    """Собирает изменения из flush и обновляет счётчики в той же транзакции"""
+    deltas = {}
+
+    def add(name, delta):
+        deltas[name] = deltas.get(name, 0) + delta
+
+    for obj in session.new:
+        model = type(obj)
+        if model in TOTAL_COUNTERS:
+            add(TOTAL_COUNTERS[model], 1)
+        if model in PENDING_COUNTERS and _is_pending(obj.is_approved):
+            add(PENDING_COUNTERS[model], 1)
+
+    for obj in session.deleted:
+        model = type(obj)
+        if model in TOTAL_COUNTERS:
+            add(TOTAL_COUNTERS[model], -1)
+        if model in PENDING_COUNTERS and _is_pending(obj.is_approved):
+            add(PENDING_COUNTERS[model], -1)
+
+    for obj in session.dirty:
+        model = type(obj)
+        if model not in PENDING_COUNTERS:
+            continue
+        history = db.inspect(obj).attrs.is_approved.history
+        if not history.has_changes():
+            continue
+        was_pending = bool(history.deleted) and _is_pending(history.deleted[0])
+        is_pending = bool(history.added) and _is_pending(history.added[0])
+        add(PENDING_COUNTERS[model], int(is_pending) - int(was_pending))
+
+    if deltas:
+        adjust_counters(session.connection(), deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_vacancy_counters(session, flush_context):
+    """Отклики, их удаление и смена статуса меняют счётчики вакансии в той же транзакции"""
+    deltas = {}
+
+    def add(vacancy_id, changes):
+        counters = deltas.setdefault(vacancy_id, {})
+        for name, delta in changes.items():
+            counters[name] = counters.get(name, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, Application):
+            # Значение по умолчанию подставляется при вставке, до неё статус может быть пустым
+            add(obj.vacancy_id, _application_deltas(obj.status or 'pending', 1))
+
+    for obj in session.deleted:
+        if isinstance(obj, Application):
+            add(obj.vacancy_id, _application_deltas(obj.status, -1))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Application):
+            continue
+        history = db.inspect(obj).attrs.status.history
+        if not history.has_changes():
+            continue
+        changes = {}
+        if history.deleted and history.deleted[0] in STATUS_COUNTERS:
+            changes[STATUS_COUNTERS[history.deleted[0]]] = -1
+        if history.added and history.added[0] in STATUS_COUNTERS:
+            name = STATUS_COUNTERS[history.added[0]]
+            changes[name] = changes.get(name, 0) + 1
+        add(obj.vacancy_id, changes)
+
+    if deltas:
+        adjust_vacancy_counters(session.connection(), deltas)
@@ -0,0 +1,113 @@
+import os
+from functools import partial
+
+from flask import current_app, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+DEFAULT_DATABASE_URI = 'sqlite:///portfolio.db'
+
+# Прагмы выполняются на каждом новом соединении; SQLITE_PRAGMAS в конфиге дополняет и переопределяет их
+DEFAULT_PRAGMAS = {
+    # Читатели не блокируются писателем и наоборот
+    'journal_mode': 'WAL',
+    # В WAL-режиме fsync только на контрольных точках; транзакция не теряется при падении процесса
+    'synchronous': 'NORMAL',
+    # Вместо мгновенного "database is locked" ждём освобождения блокировки
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КиБ
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Пул на процесс: соединения SQLite дешёвые, но прагмы и кэш страниц живут в соединении
+DEFAULT_POOL_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+}
+
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+READ_ENGINE_EXTENSION = 'sqlite_read_engine'
+
+
+def database_uri():
+    return os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+
+
+def is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def sqlite_pragmas(config, read_only=False):
+    pragmas = dict(DEFAULT_PRAGMAS)
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    if read_only:
+        pragmas['query_only'] = 'ON'
+    return pragmas
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def engine_options(config):
+    """Параметры движка для файловой SQLite: пул на много потоков и таймаут драйвера"""
+    options = dict(DEFAULT_POOL_OPTIONS)
+    busy_timeout = sqlite_pragmas(config)['busy_timeout']
+    # Соединения из пула переходят между потоками, но одновременно используются одним
+    options['connect_args'] = {'check_same_thread': False, 'timeout': busy_timeout / 1000}
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def init_database(app, db):
+    """
+    Подключает базу к приложению. Для файловой SQLite настраивает пул и прагмы,
+    а при SQLITE_READ_ENGINE=True создаёт отдельный движок только для чтения,
+    который используется в GET-запросах (см. RoutingSession).
+    """
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_uri())
+    file_sqlite = is_file_sqlite(app.config['SQLALCHEMY_DATABASE_URI'])
+    if file_sqlite:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    db.init_app(app)
+    if not file_sqlite:
+        return
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'connect', partial(_apply_pragmas, sqlite_pragmas(app.config)))
+
+        if app.config.get('SQLITE_READ_ENGINE'):
+            read_engine = create_engine(engine.url, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+            event.listen(read_engine, 'connect', partial(_apply_pragmas, sqlite_pragmas(app.config, read_only=True)))
+            app.extensions[READ_ENGINE_EXTENSION] = read_engine
+
+
+def _is_write(clause):
+    return isinstance(clause, UpdateBase)
+
+
+class RoutingSession(Session):
+    """
+    Сессия, которая в GET-запросах читает через движок только для чтения.
+    Сброс изменений (flush) и явные INSERT/UPDATE/DELETE всегда идут в основной движок.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not _is_write(clause) and has_request_context():
+            read_engine = current_app.extensions.get(READ_ENGINE_EXTENSION)
+            if read_engine is not None and request.method in READ_ONLY_METHODS:
+                return read_engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,161 @@
+import threading
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import db, Company, Portfolio, Vacancy, Application, DeletionTask
+from bulk import DELETE_HANDLERS, delete_applications, delete_vacancies, set_vacancies_active, matching_ids, chunked
+
+# Удаления крупнее этого числа откликов уходят в фоновую задачу
+LARGE_DELETE_THRESHOLD = 5000
+# Сколько строк удаляется в одной транзакции фоновой задачи
+STEP_SIZE = 1000
+
+TARGET_MODELS = {
+    'company': Company,
+    'vacancy': Vacancy,
+    'portfolio': Portfolio,
+}
+TARGET_TYPES = {model: target_type for target_type, model in TARGET_MODELS.items()}
+
+
+def _applications_filter(target_type, target_ids):
+    if target_type == 'vacancy':
+        return Application.vacancy_id.in_(target_ids)
+    if target_type == 'portfolio':
+        return Application.portfolio_id.in_(target_ids)
+    return Application.vacancy_id.in_(db.select(Vacancy.id).where(Vacancy.company_id.in_(target_ids)))
+
+
+def count_dependent_applications(target_type, target_ids):
+    total = 0
+    for chunk in chunked(target_ids):
+        total += db.session.execute(
+            db.select(func.count()).select_from(Application).where(_applications_filter(target_type, chunk))
+        ).scalar()
+    return total
+
+
+def is_large_delete(target_type, *target_ids):
+    """Удаление одного или нескольких объектов (массовое действие) затрагивает слишком много откликов"""
+    threshold = current_app.config.get('LARGE_DELETE_THRESHOLD', LARGE_DELETE_THRESHOLD)
+    return count_dependent_applications(target_type, target_ids) > threshold
+
+
+def delete_now(target_type, target_id):
+    """Удаляет объект с зависимыми строками в текущей транзакции"""
+    return DELETE_HANDLERS[TARGET_MODELS[target_type]]([target_id])
+
+
+def delete_step(task, step_size=STEP_SIZE):
+    """
+    Одна порция работы задачи. Шаги идемпотентны и опираются только на то, что ещё
+    осталось в базе, поэтому прерванную задачу можно просто запустить снова.
+    Возвращает True, когда объект удалён полностью.
+    """
+    application_ids = db.session.execute(
+        db.select(Application.id)
+        .where(_applications_filter(task.target_type, [task.target_id]))
+        .order_by(Application.id).limit(step_size)
+    ).scalars().all()
+    if application_ids:
+        task.deleted_applications += delete_applications(application_ids)
+        return False
+
+    if task.target_type == 'company':
+        vacancy_ids = db.session.execute(
+            db.select(Vacancy.id).where(Vacancy.company_id == task.target_id).order_by(Vacancy.id).limit(step_size)
+        ).scalars().all()
+        if vacancy_ids:
+            task.deleted_vacancies += delete_vacancies(vacancy_ids)
+            return False
+
+    if task.target_type == 'vacancy':
+        task.deleted_vacancies += delete_now(task.target_type, task.target_id)
+    else:
+        delete_now(task.target_type, task.target_id)
+    return True
+
+
+def enqueue_deletion(target_type, target_id, commit=True):
+    """
+    Создаёт задачу и сразу скрывает затронутые вакансии из поиска.
+    commit=False - для массовых действий, которые ставят много задач одной транзакцией.
+    """
+    task = DeletionTask.query.filter(
+        DeletionTask.target_type == target_type,
+        DeletionTask.target_id == target_id,
+        DeletionTask.status.in_(['pending', 'running'])
+    ).first()
+    if task:
+        return task
+
+    if target_type == 'company':
+        set_vacancies_active(matching_ids(Vacancy, Vacancy.company_id == target_id), False)
+    elif target_type == 'vacancy':
+        set_vacancies_active([target_id], False)
+
+    task = DeletionTask(target_type=target_type, target_id=target_id)
+    db.session.add(task)
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
+    return task
+
+
+def run_task(task_id, step_size=STEP_SIZE):
+    """Выполняет задачу до конца, фиксируя каждую порцию отдельной транзакцией"""
+    task = db.session.get(DeletionTask, task_id)
+    if task is None or task.status == 'done':
+        return task
+
+    task.status = 'running'
+    db.session.commit()
+
+    try:
+        while not delete_step(task, step_size):
+            db.session.commit()
+        task.status = 'done'
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        task = db.session.get(DeletionTask, task_id)
+        task.status = 'failed'
+        task.error = str(exc)
+        db.session.commit()
+    return task
+
+
+def start_in_background(*task_ids):
+    """Запускает задачи по очереди в фоновом потоке, чтобы не блокировать запрос администратора"""
+    app = current_app._get_current_object()
+
+    def worker():
+        with app.app_context():
+            for task_id in task_ids:
+                run_task(task_id)
+
+    thread = threading.Thread(target=worker, name=f'deletion-task-{task_ids[0]}', daemon=True)
+    thread.start()
+    return thread
+
+
+def resume_unfinished_tasks():
+    """Дозапускает задачи, прерванные остановкой процесса"""
+    task_ids = [task.id for task in DeletionTask.query.filter(
+        DeletionTask.status.in_(['pending', 'running', 'failed'])
+    ).order_by(DeletionTask.id)]
+    return [run_task(task_id) for task_id in task_ids]
+
+
+def task_progress(task):
+    return {
+        'id': task.id,
+        'target_type': task.target_type,
+        'target_id': task.target_id,
+        'status': task.status,
+        'deleted_applications': task.deleted_applications,
+        'deleted_vacancies': task.deleted_vacancies,
+        'error': task.error,
+    }
@@ -1,6 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from models import Company, Vacancy, Application, User, Portfolio, db
+from sqlalchemy.orm import joinedload
+from models import Company, Vacancy, Application, ApplicationScore, User, Portfolio, db
+from identity import owned_company, invalidate_identity
+from importer import IMPORT_FORMATS, detect_format, import_vacancies
+from notifications import NOTIFY_STATUSES, notify_application_status, wake_outbox_worker
+from pagination import keyset_paginate, get_per_page
+from ranking import refresh_scores, ranked_applications_query
 
 employer = Blueprint('employer', __name__)
 
@@ -12,14 +18,28 @@ def dashboard():
         flash('Доступ запрещен')
         return redirect(url_for('index'))
 
-    company = Company.query.filter_by(user_id=current_user.id).first()
-    vacancies = Vacancy.query.filter_by(employer_id=current_user.id).all()
-    applications = Application.query.join(Vacancy).filter(Vacancy.employer_id == current_user.id).all()
+    company = owned_company()
+
+    # Количество откликов хранится в самих вакансиях, отдельный COUNT не нужен
+    vacancies = Vacancy.query.filter_by(employer_id=current_user.id).order_by(Vacancy.id).all()
+
+    # Все отклики работодателя - по индексу employer_id, без соединения с vacancy;
+    # application.vacancy берётся из identity map, так как вакансии уже загружены
+    applications = Application.query.filter_by(employer_id=current_user.id).options(
+        joinedload(Application.seeker),
+        joinedload(Application.portfolio)
+    ).order_by(Application.id).all()
+
+    applications_by_vacancy = {}
+    for app in applications:
+        applications_by_vacancy.setdefault(app.vacancy_id, []).append(app)
 
     return render_template('employer/dashboard.html',
                            company=company,
                            vacancies=vacancies,
-                           applications=applications)
+                           applications=applications,
+                           applications_by_vacancy=applications_by_vacancy,
+                           applications_count=sum(vacancy.applications_count for vacancy in vacancies))
 
 
 @employer.route('/employer/company/edit', methods=['GET', 'POST'])
@@ -28,7 +48,7 @@ def edit_company():
     if current_user.role != 'employer':
         return redirect(url_for('index'))
 
-    company = Company.query.filter_by(user_id=current_user.id).first()
+    company = owned_company()
 
     if request.method == 'POST':
         if not company:
@@ -46,6 +66,7 @@ def edit_company():
         company.is_approved = False
 
         db.session.commit()
+        invalidate_identity(current_user.id)
         flash('Информация о компании обновлена и отправлена на модерацию')
         return redirect(url_for('employer.dashboard'))
 
@@ -58,7 +79,7 @@ def create_vacancy():
     if current_user.role != 'employer':
         return redirect(url_for('index'))
 
-    company = Company.query.filter_by(user_id=current_user.id).first()
+    company = owned_company()
 
     # Проверяем, есть ли компания и одобрена ли она
     if not company:
@@ -91,6 +112,70 @@ def create_vacancy():
     return render_template('employer/create_vacancy.html')
 
 
+@employer.route('/employer/vacancy/import', methods=['GET', 'POST'])
+@login_required
+def import_vacancy_file():
+    if current_user.role != 'employer':
+        return redirect(url_for('index'))
+
+    company = owned_company()
+
+    # Те же проверки компании, что и при создании одной вакансии
+    if not company:
+        flash('Сначала заполните информацию о компании')
+        return redirect(url_for('employer.edit_company'))
+
+    if not company.is_approved:
+        flash('Ваша компания находится на модерации. Вы не можете создавать вакансии до завершения проверки.')
+        return redirect(url_for('employer.dashboard'))
+
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Выберите файл для импорта')
+            return redirect(url_for('employer.import_vacancy_file'))
+
+        import_format = detect_format(upload.filename, request.form.get('format'))
+        result = import_vacancies(upload.stream, import_format, company, current_user.id)
+        if result.imported:
+            flash(f'Импортировано вакансий: {result.imported}. Они отправлены на модерацию')
+
+    return render_template('employer/import_vacancies.html',
+                           result=result,
+                           import_formats=IMPORT_FORMATS)
+
+
+@employer.route('/employer/vacancy/<int:vacancy_id>/applicants')
+@login_required
+def vacancy_applicants(vacancy_id):
+    if current_user.role != 'employer':
+        flash('Доступ запрещен')
+        return redirect(url_for('index'))
+
+    vacancy = db.session.get(Vacancy, vacancy_id)
+    if not vacancy or vacancy.employer_id != current_user.id:
+        flash('Вакансия не найдена')
+        return redirect(url_for('employer.dashboard'))
+
+    # Пересчитываются только новые отклики и изменившиеся портфолио, остальное берётся из таблицы оценок
+    if refresh_scores(vacancy):
+        db.session.commit()
+
+    query = ranked_applications_query(vacancy).options(
+        joinedload(Application.seeker),
+        joinedload(Application.portfolio)
+    )
+    page = keyset_paginate(query, ApplicationScore.score, Application.id,
+                           descending=True,
+                           cursor=request.args.get('cursor'),
+                           direction=request.args.get('direction', 'next'),
+                           per_page=get_per_page(request.args),
+                           position_getter=lambda row: (row[1].score, row[0].id))
+
+    return render_template('employer/vacancy_applicants.html', vacancy=vacancy, page=page)
+
+
 @employer.route('/employer/portfolio/<int:portfolio_id>')
 @login_required
 def view_portfolio(portfolio_id):
@@ -111,9 +196,9 @@ def view_portfolio(portfolio_id):
     # Проверяем, что портфолио публичное или работодатель имеет отношение к откликам
     if not portfolio.is_public:
         # Проверяем, есть ли отклик от этого соискателя на вакансии работодателя
-        application = Application.query.join(Vacancy).filter(
-            Application.portfolio_id == portfolio_id,
-            Vacancy.employer_id == current_user.id
+        application = db.session.query(Application.id).filter_by(
+            portfolio_id=portfolio_id,
+            employer_id=current_user.id
         ).first()
 
         if not application:
@@ -136,7 +221,7 @@ def update_application_status(application_id):
         return redirect(url_for('employer.dashboard'))
 
     # Проверяем, что вакансия принадлежит текущему работодателю
-    if application.vacancy.employer_id != current_user.id:
+    if application.employer_id != current_user.id:
         flash('Доступ запрещен')
         return redirect(url_for('employer.dashboard'))
 
@@ -149,6 +234,7 @@ def update_application_status(application_id):
         return redirect(url_for('employer.view_application', application_id=application_id))
 
     if new_status in ['pending', 'reviewed', 'accepted', 'rejected']:
+        status_changed = application.status != new_status
         application.status = new_status
 
         # Сохраняем причину отказа только при статусе rejected
@@ -157,7 +243,12 @@ def update_application_status(application_id):
         else:
             application.rejection_reason = None
 
+        # Уведомление пишется в той же транзакции, письмо уйдёт из фонового обработчика
+        if status_changed and new_status in NOTIFY_STATUSES:
+            notify_application_status(application)
+
         db.session.commit()
+        wake_outbox_worker()
 
         if new_status == 'rejected':
             flash(f'Отклик отклонен. Причина: {rejection_reason}')
@@ -180,7 +271,7 @@ def view_application(application_id):
         return redirect(url_for('employer.dashboard'))
 
     # Проверяем, что заявка относится к вакансии текущего работодателя
-    if application.vacancy.employer_id != current_user.id:
+    if application.employer_id != current_user.id:
         flash('Доступ запрещен')
         return redirect(url_for('employer.dashboard'))
 
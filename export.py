@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from models import db, User, Company, Portfolio, Vacancy, Application
+
+# Сколько строк драйвер отдаёт за один fetch; память не зависит от размера таблицы
+EXPORT_BATCH_SIZE = 1000
+
+# Выгружаемые колонки. Хеш пароля не выгружается никогда
+EXPORT_COLUMNS = {
+    'users': (User, ['id', 'email', 'name', 'role', 'is_active', 'created_at', 'last_login']),
+    'companies': (Company, ['id', 'user_id', 'company_name', 'industry', 'website', 'contact_email',
+                            'phone', 'address', 'is_approved', 'created_at', 'updated_at']),
+    'vacancies': (Vacancy, ['id', 'employer_id', 'company_id', 'title', 'employment_type',
+                            'experience_level', 'location', 'salary_min', 'salary_max',
+                            'is_active', 'is_approved', 'created_at', 'updated_at']),
+    'portfolios': (Portfolio, ['id', 'user_id', 'title', 'profession', 'experience_years', 'skills',
+                               'is_public', 'is_approved', 'created_at', 'updated_at']),
+    'applications': (Application, ['id', 'vacancy_id', 'seeker_id', 'portfolio_id', 'status',
+                                   'rejection_reason', 'created_at']),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(dataset, sort_by='id', order='asc', batch_size=EXPORT_BATCH_SIZE):
+    """Строки набора данных в заданном порядке, читаются курсором порциями по batch_size"""
+    model, columns = EXPORT_COLUMNS[dataset]
+    sort_column = getattr(model, sort_by)
+    if order == 'desc':
+        ordering = (sort_column.desc(), model.id.desc())
+    else:
+        ordering = (sort_column.asc(), model.id.asc())
+
+    statement = (db.select(*[getattr(model, name) for name in columns])
+                 .order_by(*ordering)
+                 .execution_options(yield_per=batch_size))
+    for row in db.session.execute(statement):
+        yield [_value(value) for value in row]
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def stream_csv(columns, rows, batch_size=EXPORT_BATCH_SIZE):
+    """CSV по кусочкам: заголовок, затем пачки по batch_size строк"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield _drain(buffer)
+            pending = 0
+    yield _drain(buffer)
+
+
+def stream_jsonl(columns, rows, batch_size=EXPORT_BATCH_SIZE):
+    """JSON Lines: один объект на строку"""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        if len(chunk) >= batch_size:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def export_stream(dataset, export_format, sort_by='id', order='asc'):
+    columns = EXPORT_COLUMNS[dataset][1]
+    rows = export_rows(dataset, sort_by, order)
+    if export_format == 'jsonl':
+        return stream_jsonl(columns, rows)
+    return stream_csv(columns, rows)
@@ -0,0 +1,74 @@
+from flask import current_app
+from sqlalchemy import case, func, literal
+
+from models import Vacancy
+from page_cache import LRUCache, current_generation
+
+# Пороги "зарплата от" в боковой панели; фильтр salary_min отбирает salary_max >= порога
+SALARY_BUCKETS = (50000, 100000, 150000, 200000, 300000)
+
+DEFAULT_FACET_TTL = 300
+FACET_CACHE_SIZE = 256
+
+# Ключ включает поколение списков вакансий, поэтому любое изменение вакансии
+# делает старые записи недостижимыми, а популярные сочетания фильтров остаются в LRU
+facet_cache = LRUCache(max_entries=FACET_CACHE_SIZE)
+
+
+def _salary_bucket():
+    # Номер наибольшего порога, который проходит вакансия; 0 - ниже всех или зарплата не указана
+    return case(*[(Vacancy.salary_max >= threshold, number)
+                  for number, threshold in reversed(list(enumerate(SALARY_BUCKETS, 1)))], else_=0)
+
+
+def _selected(value):
+    return value if value and value != 'all' else None
+
+
+def vacancy_facets(base_query, search, experience, employment_type, salary_min):
+    """
+    Количество вакансий по уровню опыта, типу занятости и порогам зарплаты для текущего поиска.
+
+    base_query - активные одобренные вакансии с уже применённым поиском, без остальных фильтров.
+    Одна агрегация GROUP BY (опыт, занятость, порог зарплаты) даёт не больше нескольких десятков строк,
+    из которых все счётчики собираются в Python. Счётчики каждого фильтра учитывают остальные
+    выбранные фильтры, но не его собственный - видно, сколько вакансий будет при переключении.
+    """
+    experience = _selected(experience)
+    employment_type = _selected(employment_type)
+    salary_min = int(salary_min) if salary_min else None
+
+    key = (current_generation(), search, experience, employment_type, salary_min)
+    cached = facet_cache.get(key)
+    if cached is not None:
+        return cached
+
+    bucket = _salary_bucket()
+    # Произвольное значение salary_min может не совпадать с порогом - группируем и по нему
+    salary_match = case((Vacancy.salary_max >= salary_min, 1), else_=0) if salary_min is not None else literal(1)
+    rows = (base_query.order_by(None)
+            .with_entities(Vacancy.experience_level, Vacancy.employment_type, bucket, salary_match,
+                           func.count(Vacancy.id))
+            .group_by(Vacancy.experience_level, Vacancy.employment_type, bucket, salary_match)
+            .all())
+
+    facets = {'experience': {}, 'employment_type': {}, 'salary': [], 'total': 0}
+    salary_counts = [0] * (len(SALARY_BUCKETS) + 1)
+    for level, kind, row_bucket, matches_salary, count in rows:
+        experience_ok = experience is None or level == experience
+        employment_ok = employment_type is None or kind == employment_type
+        if employment_ok and matches_salary:
+            facets['experience'][level] = facets['experience'].get(level, 0) + count
+        if experience_ok and matches_salary:
+            facets['employment_type'][kind] = facets['employment_type'].get(kind, 0) + count
+        if experience_ok and employment_ok:
+            salary_counts[row_bucket] += count
+            if matches_salary:
+                facets['total'] += count
+
+    # Порог включает все вакансии с зарплатой не ниже него, то есть и более высокие корзины
+    for number, threshold in enumerate(SALARY_BUCKETS, 1):
+        facets['salary'].append((threshold, sum(salary_counts[number:])))
+
+    facet_cache.set(key, facets, current_app.config.get('FACET_CACHE_TTL', DEFAULT_FACET_TTL))
+    return facets
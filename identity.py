@@ -0,0 +1,90 @@
+from flask import current_app
+from flask_login import UserMixin, current_user
+from sqlalchemy import func
+
+from models import db, User, Company, Portfolio
+from page_cache import LRUCache
+
+# Снимок личности живёт в памяти процесса; изменения из других процессов
+# становятся видны не позже чем через TTL
+DEFAULT_IDENTITY_TTL = 60
+IDENTITY_CACHE_SIZE = 2048
+
+
+class CachedUser(UserMixin):
+    """
+    Лёгкая замена ORM-объекта User для current_user: роль, статус и id
+    компании/портфолио владельца. Не привязан к сессии, поэтому безопасно
+    переиспользуется между запросами.
+    """
+
+    def __init__(self, id, email, name, role, active, company_id, portfolio_id):
+        self.id = id
+        self.email = email
+        self.name = name
+        self.role = role
+        self.active = active
+        self.company_id = company_id
+        self.portfolio_id = portfolio_id
+
+    @property
+    def is_active(self):
+        return self.active
+
+
+identity_cache = LRUCache(max_entries=IDENTITY_CACHE_SIZE)
+
+
+def _owned_id(model):
+    # Первая по id компания/портфолио пользователя, как и .filter_by(user_id=...).first()
+    return (db.select(func.min(model.id))
+            .where(model.user_id == User.id)
+            .correlate(User)
+            .scalar_subquery())
+
+
+def load_identity(user_id):
+    """Пользователь вместе с id его компании и портфолио одним запросом"""
+    row = db.session.execute(
+        db.select(User.id, User.email, User.name, User.role, User.is_active,
+                  _owned_id(Company), _owned_id(Portfolio))
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    return CachedUser(*row)
+
+
+def get_identity(user_id):
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        identity = load_identity(user_id)
+        if identity is not None:
+            identity_cache.set(user_id, identity,
+                               current_app.config.get('IDENTITY_CACHE_TTL', DEFAULT_IDENTITY_TTL))
+    return identity
+
+
+def invalidate_identity(user_id):
+    """Вызывается после коммита изменений пользователя, его компании или портфолио"""
+    identity_cache.delete(user_id)
+
+
+def _owned(model, owned_id):
+    if owned_id is None:
+        return None
+    obj = db.session.get(model, owned_id)
+    if obj is None:
+        # Строку удалили массовой операцией в обход маршрутов - забываем устаревший снимок
+        invalidate_identity(current_user.id)
+    return obj
+
+
+def owned_company():
+    """Компания текущего работодателя: запрос по первичному ключу вместо поиска по user_id"""
+    return _owned(Company, current_user.company_id)
+
+
+def owned_portfolio():
+    """Портфолио текущего соискателя"""
+    return _owned(Portfolio, current_user.portfolio_id)
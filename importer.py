@@ -0,0 +1,152 @@
+import codecs
+import csv
+import json
+
+from models import db, Vacancy
+from counters import adjust_counters, PENDING_COUNTERS, TOTAL_COUNTERS
+from search import index_vacancies
+from bulk import CHUNK_SIZE
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Допустимые значения - те же, что предлагает форма создания вакансии
+EMPLOYMENT_TYPES = {'full-time', 'part-time', 'remote', 'project'}
+EXPERIENCE_LEVELS = {'junior', 'middle', 'senior', 'lead'}
+
+REQUIRED_FIELDS = ('title', 'description', 'requirements', 'employment_type', 'experience_level')
+MAX_LENGTHS = {'title': 200, 'location': 100}
+
+# Сколько ошибок показываем пользователю; остальные только считаются
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def detect_format(filename, requested=None):
+    if requested in IMPORT_FORMATS:
+        return requested
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_records(stream, import_format):
+    """Построчно читает файл: (номер строки, запись или None, текст ошибки)"""
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if import_format == 'jsonl':
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None, 'Некорректный JSON'
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, 'Ожидался JSON-объект'
+                continue
+            yield line_number, record, None
+    else:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # Строка 1 - заголовок
+            yield reader.line_num, record, None
+
+
+def _parse_salary(value, field, errors):
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        salary = int(str(value).strip())
+    except ValueError:
+        errors.append(f'{field}: ожидается целое число')
+        return None
+    if salary < 0:
+        errors.append(f'{field}: не может быть отрицательной')
+    return salary
+
+
+def validate_record(record):
+    """Проверяет запись и приводит значения; возвращает (значения, ошибки)"""
+    errors = []
+    values = {}
+    for field in ('title', 'description', 'requirements', 'employment_type', 'experience_level', 'location'):
+        value = record.get(field)
+        values[field] = str(value).strip() if value is not None else ''
+
+    for field in REQUIRED_FIELDS:
+        if not values[field]:
+            errors.append(f'{field}: обязательное поле')
+    for field, limit in MAX_LENGTHS.items():
+        if len(values[field]) > limit:
+            errors.append(f'{field}: не длиннее {limit} символов')
+
+    if values['employment_type'] and values['employment_type'] not in EMPLOYMENT_TYPES:
+        errors.append(f"employment_type: допустимо {', '.join(sorted(EMPLOYMENT_TYPES))}")
+    if values['experience_level'] and values['experience_level'] not in EXPERIENCE_LEVELS:
+        errors.append(f"experience_level: допустимо {', '.join(sorted(EXPERIENCE_LEVELS))}")
+
+    values['location'] = values['location'] or None
+    values['salary_min'] = _parse_salary(record.get('salary_min'), 'salary_min', errors)
+    values['salary_max'] = _parse_salary(record.get('salary_max'), 'salary_max', errors)
+    if (values['salary_min'] is not None and values['salary_max'] is not None
+            and values['salary_min'] > values['salary_max']):
+        errors.append('salary_min больше salary_max')
+
+    return values, errors
+
+
+def _insert_chunk(rows):
+    """Один INSERT на пачку; индекс поиска и счётчики обновляются явно, ORM-события тут не срабатывают"""
+    vacancy_ids = db.session.execute(db.insert(Vacancy).returning(Vacancy.id), rows).scalars().all()
+    connection = db.session.connection()
+    index_vacancies(connection, vacancy_ids)
+    # Новые вакансии не одобрены, поэтому публичные списки и их кэш не меняются
+    adjust_counters(connection, {
+        TOTAL_COUNTERS[Vacancy]: len(vacancy_ids),
+        PENDING_COUNTERS[Vacancy]: len(vacancy_ids),
+    })
+    db.session.commit()
+    return len(vacancy_ids)
+
+
+def import_vacancies(stream, import_format, company, employer_id, chunk_size=CHUNK_SIZE):
+    """
+    Потоковый импорт: строки проверяются по одной, корректные вставляются пачками
+    по chunk_size с коммитом на пачку. Ошибочные строки пропускаются и попадают в отчёт.
+    Все вакансии уходят на модерацию.
+    """
+    result = ImportResult()
+    chunk = []
+    try:
+        for line_number, record, error in read_records(stream, import_format):
+            if error:
+                result.add_error(line_number, error)
+                continue
+
+            values, errors = validate_record(record)
+            if errors:
+                result.add_error(line_number, '; '.join(errors))
+                continue
+
+            values.update(employer_id=employer_id, company_id=company.id, is_active=True, is_approved=False)
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                result.imported += _insert_chunk(chunk)
+                chunk = []
+    except (UnicodeDecodeError, csv.Error) as exc:
+        result.add_error(None, f'Файл не удалось прочитать: {exc}')
+
+    if chunk:
+        result.imported += _insert_chunk(chunk)
+    return result
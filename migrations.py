@@ -0,0 +1,193 @@
+from datetime import datetime
+
+from sqlalchemy import text
+
+from search import create_search_index, rebuild_search_index
+from counters import reconcile_counters, counters_initialized, check_application_consistency, VACANCY_COUNTERS
+
+# Таблица с номерами применённых миграций
+VERSION_TABLE = 'schema_version'
+
+# Размер пачки для массовых UPDATE: каждая пачка - отдельная короткая транзакция
+BACKFILL_BATCH_SIZE = 5000
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Регистрирует функцию как миграцию с номером версии"""
+    def decorator(func):
+        MIGRATIONS.append((version, name, func))
+        return func
+    return decorator
+
+
+def table_exists(conn, table):
+    return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {'name': table}).first() is not None
+
+
+def create_indexes(conn, statements):
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def column_exists(conn, table, column):
+    rows = conn.execute(text(f"PRAGMA table_info({table})")).all()
+    return any(row[1] == column for row in rows)
+
+
+def add_column(conn, table, column, definition):
+    """ALTER TABLE ADD COLUMN, если столбца ещё нет"""
+    if not column_exists(conn, table, column):
+        print(f"Добавляем столбец {column} в таблицу {table}...")
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+
+
+def batched_update(conn, table, assignments, where, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Выполняет UPDATE пачками по rowid и фиксирует каждую пачку отдельно,
+    чтобы миграция большой базы не держала долгую блокировку записи.
+    where должно перестать выполняться для обновлённых строк, иначе цикл не закончится.
+    """
+    total = 0
+    while True:
+        result = conn.execute(text(
+            f"UPDATE {table} SET {assignments} WHERE rowid IN "
+            f"(SELECT rowid FROM {table} WHERE {where} LIMIT :batch_size)"
+        ), {'batch_size': batch_size})
+        conn.commit()
+        if result.rowcount <= 0:
+            break
+        total += result.rowcount
+    if total:
+        print(f"Обновлено строк в {table}: {total}")
+    return total
+
+
+@migration(1, 'company_is_approved')
+def add_company_is_approved(conn):
+    add_column(conn, 'company', 'is_approved', 'BOOLEAN DEFAULT FALSE')
+
+
+@migration(2, 'portfolio_is_approved')
+def add_portfolio_is_approved(conn):
+    add_column(conn, 'portfolio', 'is_approved', 'BOOLEAN DEFAULT FALSE')
+
+
+@migration(3, 'backfill_moderation_and_dates')
+def backfill_moderation_and_dates(conn):
+    # Строки, созданные до появления модерации, попадают в очередь на проверку
+    batched_update(conn, 'company', 'is_approved = 0', 'is_approved IS NULL')
+    batched_update(conn, 'portfolio', 'is_approved = 0', 'is_approved IS NULL')
+    batched_update(conn, 'vacancy', 'is_approved = 0', 'is_approved IS NULL')
+    # Портфолио без дат ломают сортировку в админке
+    batched_update(conn, 'portfolio', 'created_at = CURRENT_TIMESTAMP', 'created_at IS NULL')
+    batched_update(conn, 'portfolio', 'updated_at = CURRENT_TIMESTAMP', 'updated_at IS NULL')
+
+
+# DDL миграций зафиксирован текстом: результат миграции зависит только от её номера,
+# а не от того, какие индексы объявлены в models.py на момент запуска.
+# Выпущенную миграцию не меняем - новый индекс добавляется новой миграцией
+
+@migration(4, 'hot_path_indexes')
+def create_hot_path_indexes(conn):
+    create_indexes(conn, [
+        "CREATE INDEX IF NOT EXISTS ix_company_user_id ON company (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_company_pending ON company (id) WHERE is_approved = 0",
+        "CREATE INDEX IF NOT EXISTS ix_portfolio_user_id ON portfolio (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_portfolio_pending ON portfolio (id) WHERE is_approved = 0",
+        "CREATE INDEX IF NOT EXISTS ix_vacancy_listing ON vacancy (is_active, is_approved, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_vacancy_employer_id ON vacancy (employer_id)",
+        "CREATE INDEX IF NOT EXISTS ix_vacancy_company_id ON vacancy (company_id)",
+        "CREATE INDEX IF NOT EXISTS ix_vacancy_pending ON vacancy (id) WHERE is_approved = 0",
+        # Заменён уникальным индексом в миграции 9
+        "CREATE INDEX IF NOT EXISTS ix_application_vacancy_seeker ON application (vacancy_id, seeker_id)",
+        "CREATE INDEX IF NOT EXISTS ix_application_seeker_id ON application (seeker_id)",
+    ])
+
+
+@migration(5, 'vacancy_search_index')
+def create_vacancy_search_index(conn):
+    if create_search_index(conn):
+        print("Строим полнотекстовый индекс вакансий...")
+        conn.commit()
+        rebuild_search_index(conn, commit=True)
+
+
+@migration(6, 'stat_counters')
+def init_stat_counters(conn):
+    if not counters_initialized(conn):
+        print("Пересчитываем счётчики статистики...")
+        reconcile_counters(conn)
+
+
+@migration(7, 'vacancy_updated_at_index')
+def create_vacancy_updated_at_index(conn):
+    # Инкрементальная синхронизация рекомендаций выбирает вакансии по updated_at
+    create_indexes(conn, ["CREATE INDEX IF NOT EXISTS ix_vacancy_updated_at ON vacancy (updated_at)"])
+
+
+@migration(8, 'application_denormalization')
+def denormalize_applications(conn):
+    add_column(conn, 'application', 'employer_id', 'INTEGER REFERENCES user (id)')
+    for column in VACANCY_COUNTERS:
+        add_column(conn, 'vacancy', column, 'INTEGER NOT NULL DEFAULT 0')
+    conn.commit()
+
+    batched_update(conn, 'application',
+                   'employer_id = (SELECT employer_id FROM vacancy WHERE vacancy.id = application.vacancy_id)',
+                   'employer_id IS NULL AND vacancy_id IN (SELECT id FROM vacancy)')
+    print("Пересчитываем счётчики откликов вакансий...")
+    check_application_consistency(conn, fix=True)
+    conn.commit()
+    create_indexes(conn, [
+        "CREATE INDEX IF NOT EXISTS ix_application_employer_portfolio ON application (employer_id, portfolio_id)",
+    ])
+
+
+@migration(9, 'unique_application_per_seeker')
+def add_unique_application_index(conn):
+    # Дубликаты от двойных кликов: оставляем самый ранний отклик
+    duplicates = "id NOT IN (SELECT MIN(id) FROM application GROUP BY vacancy_id, seeker_id)"
+    # Кэш оценок появился вместе с таблицей application_score и может ещё отсутствовать
+    if table_exists(conn, 'application_score'):
+        conn.execute(text(f"DELETE FROM application_score WHERE application_id IN "
+                          f"(SELECT id FROM application WHERE {duplicates})"))
+    removed = conn.execute(text(f"DELETE FROM application WHERE {duplicates}")).rowcount
+    if removed:
+        print(f"Удалено повторных откликов: {removed}")
+        reconcile_counters(conn)
+        check_application_consistency(conn, fix=True)
+    conn.execute(text("DROP INDEX IF EXISTS ix_application_vacancy_seeker"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_application_vacancy_seeker ON application (vacancy_id, seeker_id)"
+    ))
+
+
+def applied_versions(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+    conn.commit()
+    return set(conn.execute(text(f"SELECT version FROM {VERSION_TABLE}")).scalars())
+
+
+def run_migrations(engine):
+    """Применяет все ещё не применённые миграции по порядку. Возвращает список применённых версий"""
+    applied = []
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+        for version, name, func in sorted(MIGRATIONS, key=lambda item: item[0]):
+            if version in done:
+                continue
+            print(f"Применяем миграцию {version}: {name}")
+            func(conn)
+            conn.execute(
+                text(f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {'version': version, 'name': name, 'applied_at': datetime.utcnow()}
+            )
+            conn.commit()
+            applied.append(version)
+    return applied
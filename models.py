@@ -3,7 +3,9 @@ from flask_login import UserMixin
 from datetime import datetime
 import re
 
-db = SQLAlchemy()
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(UserMixin, db.Model):
@@ -33,6 +35,12 @@ class User(UserMixin, db.Model):
 
 
 class Company(db.Model):
+    __table_args__ = (
+        db.Index('ix_company_user_id', 'user_id'),
+        # Частичный индекс для очереди модерации
+        db.Index('ix_company_pending', 'id', sqlite_where=db.text('is_approved = 0')),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     company_name = db.Column(db.String(200), nullable=False)
@@ -49,6 +57,11 @@ class Company(db.Model):
 
 
 class Portfolio(db.Model):
+    __table_args__ = (
+        db.Index('ix_portfolio_user_id', 'user_id'),
+        db.Index('ix_portfolio_pending', 'id', sqlite_where=db.text('is_approved = 0')),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
@@ -75,6 +88,16 @@ class Portfolio(db.Model):
 
 
 class Vacancy(db.Model):
+    __table_args__ = (
+        # Публичный список вакансий: WHERE is_active AND is_approved ORDER BY created_at
+        db.Index('ix_vacancy_listing', 'is_active', 'is_approved', 'created_at'),
+        db.Index('ix_vacancy_employer_id', 'employer_id'),
+        db.Index('ix_vacancy_company_id', 'company_id'),
+        db.Index('ix_vacancy_pending', 'id', sqlite_where=db.text('is_approved = 0')),
+        # Инкрементальная синхронизация индекса рекомендаций
+        db.Index('ix_vacancy_updated_at', 'updated_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     employer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
@@ -90,15 +113,31 @@ class Vacancy(db.Model):
     is_approved = db.Column(db.Boolean, default=False)  # Модерация вакансий
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Счётчики откликов, обновляются вместе с откликами (см. counters.py)
+    applications_count = db.Column(db.Integer, default=0, nullable=False)
+    pending_count = db.Column(db.Integer, default=0, nullable=False)
+    reviewed_count = db.Column(db.Integer, default=0, nullable=False)
+    accepted_count = db.Column(db.Integer, default=0, nullable=False)
+    rejected_count = db.Column(db.Integer, default=0, nullable=False)
 
     company = db.relationship('Company', backref='vacancies', lazy=True)
     applications = db.relationship('Application', backref='vacancy', lazy=True)
 
 
 class Application(db.Model):
+    __table_args__ = (
+        # Один отклик соискателя на вакансию; на нём же держится ON CONFLICT в applications.py
+        db.Index('uq_application_vacancy_seeker', 'vacancy_id', 'seeker_id', unique=True),
+        db.Index('ix_application_seeker_id', 'seeker_id'),
+        # Кабинет работодателя и проверки доступа без соединения с vacancy
+        db.Index('ix_application_employer_portfolio', 'employer_id', 'portfolio_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     vacancy_id = db.Column(db.Integer, db.ForeignKey('vacancy.id'), nullable=False)
     seeker_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Копия vacancy.employer_id, заполняется при вставке (см. counters.py)
+    employer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     portfolio_id = db.Column(db.Integer, db.ForeignKey('portfolio.id'), nullable=False)
     cover_letter = db.Column(db.Text)
     status = db.Column(db.String(50), default='pending')  # pending, reviewed, rejected, accepted
@@ -106,5 +145,77 @@ class Application(db.Model):
     rejection_reason = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    seeker = db.relationship('User', backref='applications', lazy=True)
-    portfolio = db.relationship('Portfolio', backref='applications', lazy=True)
\ No newline at end of file
+    seeker = db.relationship('User', backref='applications', lazy=True, foreign_keys=[seeker_id])
+    portfolio = db.relationship('Portfolio', backref='applications', lazy=True)
+
+
+class StatCounter(db.Model):
+    """Счётчики для статистики админ-панели, обновляются событиями моделей (см. counters.py)"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DeletionTask(db.Model):
+    """Фоновое удаление большой компании/вакансии/портфолио пачками (см. deletions.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    target_type = db.Column(db.String(20), nullable=False)  # company, vacancy, portfolio
+    target_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, running, done, failed
+    deleted_applications = db.Column(db.Integer, default=0, nullable=False)
+    deleted_vacancies = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Notification(db.Model):
+    """Уведомление во входящих пользователя (см. notifications.py)"""
+    __table_args__ = (
+        db.Index('ix_notification_user_unread', 'user_id', 'is_read'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    application_id = db.Column(db.Integer)
+    title = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class OutboxMessage(db.Model):
+    """
+    Письмо, записанное в той же транзакции, что и вызвавшее его изменение.
+    Отправляется фоновым обработчиком с повторами (см. notifications.py)
+    """
+    __table_args__ = (
+        # Выборка очереди: WHERE status = 'pending' AND next_attempt_at <= now
+        db.Index('ix_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(100), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+
+class ApplicationScore(db.Model):
+    """Кэш оценки соответствия отклика вакансии (см. ranking.py)"""
+    __table_args__ = (
+        # Список кандидатов вакансии: ORDER BY score DESC, application_id DESC
+        db.Index('ix_application_score_vacancy', 'vacancy_id', 'score'),
+    )
+
+    application_id = db.Column(db.Integer, primary_key=True)
+    vacancy_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    skills_score = db.Column(db.Float, nullable=False)
+    experience_score = db.Column(db.Float, nullable=False)
+    profession_score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
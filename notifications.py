@@ -0,0 +1,179 @@
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from flask import current_app
+
+from models import db, Notification, OutboxMessage
+
+# Статусы отклика, о смене на которые сообщаем соискателю
+NOTIFY_STATUSES = {
+    'reviewed': 'на рассмотрении',
+    'accepted': 'принят',
+    'rejected': 'отклонён',
+}
+
+OUTBOX_BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+# Пока письмо отправляется, другие обработчики его не берут; после падения оно вернётся в очередь
+CLAIM_LEASE = timedelta(minutes=5)
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 6 * 60 * 60
+WORKER_INTERVAL = 5
+
+# Будит фоновый обработчик сразу после коммита с новыми письмами
+_wakeup = threading.Event()
+
+
+def notify_application_status(application):
+    """
+    Уведомление соискателя о новом статусе отклика: запись во входящих и письмо в outbox.
+    Строки добавляются в текущую сессию и фиксируются вместе со сменой статуса.
+    """
+    vacancy = application.vacancy
+    title = f'Отклик на вакансию «{vacancy.title}» {NOTIFY_STATUSES[application.status]}'
+    lines = [f'Компания {vacancy.company.company_name} изменила статус вашего отклика: '
+             f'{NOTIFY_STATUSES[application.status]}.']
+    if application.status == 'rejected' and application.rejection_reason:
+        lines.append(f'Причина: {application.rejection_reason}')
+    body = '\n'.join(lines)
+
+    db.session.add(Notification(user_id=application.seeker_id, application_id=application.id,
+                                title=title, body=body))
+    db.session.add(OutboxMessage(recipient=application.seeker.email, subject=title, body=body))
+
+
+def wake_outbox_worker():
+    _wakeup.set()
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Забирает пачку писем одним UPDATE ... RETURNING: попытка засчитывается, а срок
+    следующей сдвигается на CLAIM_LEASE, поэтому параллельные обработчики не берут одно письмо дважды.
+    """
+    now = datetime.utcnow()
+    due = (db.select(OutboxMessage.id)
+           .where(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now)
+           .order_by(OutboxMessage.id)
+           .limit(batch_size)
+           .scalar_subquery())
+    claimed_ids = db.session.execute(
+        db.update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due))
+        .values(attempts=OutboxMessage.attempts + 1, next_attempt_at=now + CLAIM_LEASE)
+        .returning(OutboxMessage.id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    db.session.commit()
+    if not claimed_ids:
+        return []
+    return OutboxMessage.query.filter(OutboxMessage.id.in_(claimed_ids)).order_by(OutboxMessage.id).all()
+
+
+def _connect_smtp(config):
+    smtp = smtplib.SMTP(config.get('MAIL_SERVER', 'localhost'), config.get('MAIL_PORT', 1025),
+                        timeout=config.get('MAIL_TIMEOUT', 10))
+    if config.get('MAIL_USE_TLS'):
+        smtp.starttls()
+    if config.get('MAIL_USERNAME'):
+        smtp.login(config['MAIL_USERNAME'], config.get('MAIL_PASSWORD', ''))
+    return smtp
+
+
+def _build_email(config, message):
+    email = EmailMessage()
+    email['From'] = config.get('MAIL_DEFAULT_SENDER', 'noreply@portfolio.local')
+    email['To'] = message.recipient
+    email['Subject'] = message.subject
+    email.set_content(message.body)
+    return email
+
+
+def drain_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Отправляет все письма, срок которых подошёл, пачками по одному SMTP-соединению. Возвращает (отправлено, ошибок)"""
+    config = current_app.config
+    sent = failed = 0
+    while True:
+        messages = claim_batch(batch_size)
+        if not messages:
+            return sent, failed
+
+        smtp = None
+        try:
+            smtp = _connect_smtp(config)
+        except (OSError, smtplib.SMTPException) as exc:
+            connection_error = exc
+        else:
+            connection_error = None
+
+        for message in messages:
+            try:
+                if connection_error is not None:
+                    raise connection_error
+                smtp.send_message(_build_email(config, message))
+            except (OSError, smtplib.SMTPException) as exc:
+                failed += 1
+                message.last_error = str(exc)
+                if message.attempts >= config.get('OUTBOX_MAX_ATTEMPTS', MAX_ATTEMPTS):
+                    message.status = 'failed'
+                else:
+                    message.next_attempt_at = datetime.utcnow() + _retry_delay(message.attempts)
+            else:
+                sent += 1
+                message.status = 'sent'
+                message.sent_at = datetime.utcnow()
+                message.last_error = None
+            # Фиксируем каждое письмо: после падения процесса отправленное не уйдёт повторно
+            db.session.commit()
+
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+
+        if connection_error is not None:
+            # Сервер недоступен - остальная очередь подождёт следующего прохода
+            return sent, failed
+
+
+def run_outbox_worker(app, interval=WORKER_INTERVAL, stop=None):
+    """Цикл обработчика: разбирает очередь, затем ждёт interval секунд или сигнала о новых письмах"""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                drain_outbox()
+            except Exception:
+                app.logger.exception('Ошибка обработчика outbox')
+                db.session.rollback()
+            finally:
+                db.session.remove()
+        _wakeup.wait(interval)
+        _wakeup.clear()
+
+
+def start_outbox_worker(app, interval=WORKER_INTERVAL):
+    """Запускает обработчик в фоновом потоке процесса веб-сервера"""
+    thread = threading.Thread(target=run_outbox_worker, args=(app, interval), name='outbox-worker', daemon=True)
+    thread.start()
+    return thread
+
+
+def unread_count(user_id):
+    return Notification.query.filter_by(user_id=user_id, is_read=False).count()
+
+
+def mark_all_read(user_id):
+    return db.session.execute(
+        db.update(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read == db.false())
+        .values(is_read=True),
+        execution_options={'synchronize_session': False}
+    ).rowcount
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session, current_app
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, Vacancy, Company, StatCounter
+from counters import adjust_counters
+
+# Номер поколения списков вакансий хранится в stat_counter, поэтому он общий
+# для всех процессов и увеличивается в той же транзакции, что и изменение вакансии
+GENERATION_COUNTER = 'vacancy_listing_generation'
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 512
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш с ограничением размера и временем жизни записей"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+            }
+
+
+page_cache = LRUCache()
+
+
+def current_generation():
+    return db.session.query(StatCounter.value).filter_by(name=GENERATION_COUNTER).scalar() or 0
+
+
+def invalidate_listings(connection):
+    """Сбрасывает кэш списков вакансий (для массовых операций в обход ORM-событий)"""
+    adjust_counters(connection, {GENERATION_COUNTER: 1})
+
+
+def normalized_query_string():
+    # Пустые параметры не влияют на выдачу, порядок параметров тоже
+    return '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)) if value)
+
+
+def cacheable_request():
+    # Кэшируем только анонимные GET-запросы без flash-сообщений в сессии
+    return (request.method == 'GET'
+            and not current_user.is_authenticated
+            and not session.get('_flashes'))
+
+
+def cached_page(ttl=None):
+    """Кэширует отрисованную страницу для анонимных посетителей"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('PAGE_CACHE_ENABLED', True) or not cacheable_request():
+                return view(*args, **kwargs)
+
+            key = (current_generation(), request.path, normalized_query_string())
+            cached = page_cache.get(key)
+            if cached is not None:
+                body, status, content_type = cached
+                response = current_app.response_class(body, status=status, content_type=content_type)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                page_cache.set(key, (response.get_data(), response.status_code, response.content_type),
+                               ttl or current_app.config.get('PAGE_CACHE_TTL', DEFAULT_TTL))
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_generation(session, flush_context):
+    """Любое изменение вакансий или компаний (их данные выводятся в списках) делает кэш устаревшим"""
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, (Vacancy, Company)):
+            invalidate_listings(session.connection())
+            return
@@ -0,0 +1,156 @@
+import base64
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Размер страницы по умолчанию и верхняя граница для параметра per_page
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# Кэш общего количества строк: ключ -> (время истечения, значение)
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 256
+_count_cache = {}
+
+
+class KeysetPage:
+    """Страница результатов keyset-пагинации"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(value, row_id):
+    """Упаковывает позицию (значение сортировки, id) в строку для URL"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, column):
+    """Распаковывает курсор. Возвращает None для повреждённого курсора"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw.decode('utf-8'))
+        if value is not None and _python_type(column) is datetime:
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def _after(column, id_column, value, row_id, descending):
+    """Условие «строго после позиции (value, row_id)» для порядка SQLite (NULL меньше любых значений)"""
+    if descending:
+        if value is None:
+            return and_(column.is_(None), id_column < row_id)
+        return or_(column < value, and_(column == value, id_column < row_id), column.is_(None))
+
+    if value is None:
+        return or_(column.isnot(None), and_(column.is_(None), id_column > row_id))
+    return or_(column > value, and_(column == value, id_column > row_id))
+
+
+def _ordering(column, id_column, descending):
+    if descending:
+        return column.desc(), id_column.desc()
+    return column.asc(), id_column.asc()
+
+
+def get_per_page(args, default=DEFAULT_PER_PAGE):
+    """Читает per_page из параметров запроса с ограничением сверху"""
+    try:
+        per_page = int(args.get('per_page', default))
+    except (TypeError, ValueError):
+        per_page = default
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def keyset_paginate(query, column, id_column, descending=False, cursor=None, direction='next',
+                    per_page=DEFAULT_PER_PAGE, position_getter=None):
+    """
+    Keyset-пагинация запроса по колонке сортировки с id в качестве тай-брейкера.
+    Стоимость страницы не зависит от её номера: вместо OFFSET используется
+    условие WHERE (column, id) > (value, id последней строки).
+    position_getter возвращает (значение сортировки, id) для строки, если значение
+    не является атрибутом модели (например, релевантность поиска).
+    """
+    if position_getter is None:
+        position_getter = lambda item: (getattr(item, column.key), item.id)
+
+    position = decode_cursor(cursor, column)
+    backwards = position is not None and direction == 'prev'
+
+    # Для предыдущей страницы идём в обратном порядке и затем разворачиваем результат
+    scan_descending = descending != backwards
+    if position is not None:
+        query = query.filter(_after(column, id_column, position[0], position[1], scan_descending))
+
+    items = query.order_by(None).order_by(*_ordering(column, id_column, scan_descending)).limit(per_page + 1).all()
+
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+
+    def cursor_for(item):
+        return encode_cursor(*position_getter(item))
+
+    next_cursor = prev_cursor = None
+    if items:
+        if has_more or backwards:
+            next_cursor = cursor_for(items[-1])
+        if (has_more and backwards) or (position is not None and not backwards):
+            prev_cursor = cursor_for(items[0])
+
+    return KeysetPage(items, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def cached_count(key, query, ttl=COUNT_CACHE_TTL):
+    """Общее количество строк с кэшированием на ttl секунд"""
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = query.order_by(None).count()
+
+    if len(_count_cache) >= COUNT_CACHE_SIZE:
+        # Выбрасываем самые старые записи
+        for stale_key, _ in sorted(_count_cache.items(), key=lambda item: item[1][0])[:COUNT_CACHE_SIZE // 4]:
+            _count_cache.pop(stale_key, None)
+    _count_cache[key] = (now + ttl, total)
+    return total
+
+
+def clear_count_cache():
+    _count_cache.clear()
@@ -0,0 +1,260 @@
+import heapq
+import logging
+import re
+import statistics
+import threading
+import time
+from collections import deque
+
+from flask import g, request, current_app, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('perf.slow')
+
+# Пороги по умолчанию; переопределяются PERF_SLOW_REQUEST_MS / PERF_SLOW_QUERY_MS
+SLOW_REQUEST_MS = 500
+SLOW_QUERY_MS = 100
+# Сколько последних запросов хранится для /admin/perf и сколько самых медленных SQL в каждом
+BUFFER_SIZE = 5000
+SLOWEST_PER_REQUEST = 3
+PARAMS_PREVIEW = 200
+DEFAULT_WINDOW = 15 * 60
+
+NUMBER_RE = re.compile(r'\b\d+\b')
+IN_LIST_RE = re.compile(r'\(\s*(\?\s*,\s*)+\?\s*\)')
+SPACES_RE = re.compile(r'\s+')
+
+
+class RequestStats:
+    """Статистика SQL одного HTTP-запроса"""
+
+    def __init__(self, capture_params=False):
+        self.started = time.perf_counter()
+        # Значения параметров (хэши паролей, email) сохраняются только по явному PERF_CAPTURE_PARAMS
+        self.capture_params = capture_params
+        self.query_count = 0
+        self.db_time = 0.0
+        # Куча (длительность, номер, текст, параметры) самых медленных запросов
+        self.slowest = []
+        # (имя шаблона, длительность) для каждого render_template; стек - для вложенных вызовов
+        self.templates = []
+        self._template_started = []
+
+    def add(self, statement, parameters, duration):
+        self.query_count += 1
+        self.db_time += duration
+        full = len(self.slowest) >= SLOWEST_PER_REQUEST
+        if full and duration <= self.slowest[0][0]:
+            return
+        if not self.capture_params:
+            parameters = _redact(parameters)
+        item = (duration, self.query_count, statement, parameters)
+        if full:
+            heapq.heapreplace(self.slowest, item)
+        else:
+            heapq.heappush(self.slowest, item)
+
+    def start_template(self):
+        self._template_started.append(time.perf_counter())
+
+    def finish_template(self, name):
+        if self._template_started:
+            self.templates.append((name, time.perf_counter() - self._template_started.pop()))
+
+    @property
+    def template_time(self):
+        return sum(duration for _, duration in self.templates)
+
+    def slowest_statements(self):
+        return [{'statement': statement, 'params': _preview(parameters), 'ms': round(duration * 1000, 2)}
+                for duration, _, statement, parameters in sorted(self.slowest, reverse=True)]
+
+
+class PerfBuffer:
+    """Кольцевой буфер последних запросов: память ограничена, запись - O(1)"""
+
+    def __init__(self, size=BUFFER_SIZE):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def snapshot(self, window=None):
+        with self._lock:
+            records = list(self._records)
+        if window:
+            since = time.time() - window
+            records = [record for record in records if record['at'] >= since]
+        return records
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+perf_buffer = PerfBuffer()
+
+
+def _redact(parameters):
+    # Оставляем только число параметров, чтобы в буфер не попадали сами значения
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f'<{len(parameters)} наборов параметров скрыто>'
+    return f'<{len(parameters or ())} параметров скрыто>'
+
+
+def _preview(parameters):
+    if isinstance(parameters, str):
+        return parameters
+    text = repr(parameters)
+    return text if len(text) <= PARAMS_PREVIEW else text[:PARAMS_PREVIEW] + '...'
+
+
+def normalize_statement(statement):
+    """Приводит SQL к шаблону, чтобы одинаковые запросы с разными IN-списками группировались вместе"""
+    statement = SPACES_RE.sub(' ', statement).strip()
+    statement = IN_LIST_RE.sub('(?...)', statement)
+    return NUMBER_RE.sub('N', statement)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'perf' in g:
+        context._perf_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_perf_started', None)
+    if started is None or not has_request_context() or 'perf' not in g:
+        return
+    g.perf.add(statement, parameters, time.perf_counter() - started)
+
+
+def _before_render(sender, template, context, **extra):
+    if 'perf' in g:
+        g.perf.start_template()
+
+
+def _after_render(sender, template, context, **extra):
+    if 'perf' in g:
+        g.perf.finish_template(template.name or '<string>')
+
+
+def _start_request():
+    g.perf = RequestStats(current_app.config.get('PERF_CAPTURE_PARAMS', False))
+
+
+def _finish_request(response):
+    stats = g.pop('perf', None)
+    if stats is None:
+        return response
+
+    total = (time.perf_counter() - stats.started) * 1000
+    db_ms = stats.db_time * 1000
+    template_ms = stats.template_time * 1000
+    response.headers['Server-Timing'] = (
+        f'db;dur={db_ms:.1f};desc="{stats.query_count} queries", tpl;dur={template_ms:.1f}, '
+        f'app;dur={total - db_ms:.1f}, total;dur={total:.1f}'
+    )
+
+    slowest = stats.slowest_statements()
+    record = {
+        'at': time.time(),
+        'endpoint': request.endpoint or request.path,
+        'method': request.method,
+        'status': response.status_code,
+        'ms': round(total, 2),
+        'db_ms': round(db_ms, 2),
+        'queries': stats.query_count,
+        'slowest': slowest,
+        'templates': [(name, round(duration * 1000, 2)) for name, duration in stats.templates],
+    }
+    perf_buffer.append(record)
+
+    slow_request = total >= current_app.config.get('PERF_SLOW_REQUEST_MS', SLOW_REQUEST_MS)
+    slow_query = slowest and slowest[0]['ms'] >= current_app.config.get('PERF_SLOW_QUERY_MS', SLOW_QUERY_MS)
+    if slow_request or slow_query:
+        # Параметры в журнал не пишутся никогда, даже при PERF_CAPTURE_PARAMS
+        logger.warning('%s %s %s: %.1f ms, SQL %.1f ms в %d запросах; самый медленный: %s (%.1f ms)',
+                       record['method'], request.path, record['status'], total, db_ms,
+                       stats.query_count, SPACES_RE.sub(' ', slowest[0]['statement']) if slowest else '-',
+                       slowest[0]['ms'] if slowest else 0)
+    return response
+
+
+def init_perf(app):
+    """Подключает замеры к приложению; PERF_ENABLED=False отключает их"""
+    if not app.config.get('PERF_ENABLED', True):
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(window=DEFAULT_WINDOW, limit=20):
+    """Худшие маршруты, SQL-шаблоны и шаблоны страниц за последние window секунд"""
+    records = perf_buffer.snapshot(window)
+
+    routes = {}
+    statements = {}
+    templates = {}
+    for record in records:
+        routes.setdefault((record['method'], record['endpoint']), []).append(record)
+        for name, duration in record.get('templates', ()):
+            templates.setdefault(name, []).append(duration)
+        for item in record['slowest']:
+            key = normalize_statement(item['statement'])
+            entry = statements.setdefault(key, {'statement': key, 'count': 0, 'total_ms': 0.0,
+                                                'max_ms': 0.0, 'sample': item, 'endpoint': record['endpoint']})
+            entry['count'] += 1
+            entry['total_ms'] += item['ms']
+            if item['ms'] >= entry['max_ms']:
+                entry['max_ms'] = item['ms']
+                entry['sample'] = item
+                entry['endpoint'] = record['endpoint']
+
+    route_rows = []
+    for (method, endpoint), items in routes.items():
+        durations = [item['ms'] for item in items]
+        route_rows.append({
+            'method': method,
+            'endpoint': endpoint,
+            'count': len(items),
+            'p50': round(statistics.median(durations), 2),
+            'p95': round(_percentile(durations, 0.95), 2),
+            'max': round(max(durations), 2),
+            'queries': round(statistics.mean(item['queries'] for item in items), 1),
+            'db_ms': round(statistics.mean(item['db_ms'] for item in items), 2),
+        })
+    route_rows.sort(key=lambda row: row['p95'], reverse=True)
+
+    statement_rows = sorted(statements.values(), key=lambda row: row['total_ms'], reverse=True)
+    for row in statement_rows:
+        row['total_ms'] = round(row['total_ms'], 2)
+
+    template_rows = [{
+        'name': name,
+        'count': len(durations),
+        'p50': round(statistics.median(durations), 2),
+        'p95': round(_percentile(durations, 0.95), 2),
+        'max': round(max(durations), 2),
+        'total_ms': round(sum(durations), 2),
+    } for name, durations in templates.items()]
+    template_rows.sort(key=lambda row: row['total_ms'], reverse=True)
+
+    return {
+        'window': window,
+        'requests': len(records),
+        'routes': route_rows[:limit],
+        'statements': statement_rows[:limit],
+        'templates': template_rows[:limit],
+    }
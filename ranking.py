@@ -0,0 +1,156 @@
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, Application, ApplicationScore, Portfolio
+from recommendations import tokenize_skills, vacancy_vector
+
+# Вклад составляющих в итоговую оценку (0-100)
+SKILLS_WEIGHT = 0.6
+EXPERIENCE_WEIGHT = 0.25
+PROFESSION_WEIGHT = 0.15
+
+# Сколько лет опыта ожидается на уровне вакансии
+REQUIRED_YEARS = {
+    'junior': 0,
+    'middle': 1,
+    'senior': 3,
+    'lead': 5,
+}
+
+SCORE_BATCH_SIZE = 1000
+
+
+@lru_cache(maxsize=4096)
+def _terms(value):
+    # Многие соискатели указывают одинаковые навыки - токенизируем каждую строку один раз
+    return frozenset(tokenize_skills(value))
+
+
+class VacancyProfile:
+    """
+    Всё, что нужно для оценки откликов на вакансию, считается один раз. Термы вакансии
+    образуют столбцы матрицы "отклик x терм", оценки пачки - матричные операции над ней.
+    """
+
+    def __init__(self, vacancy):
+        requirements = vacancy_vector('', vacancy.requirements)
+        terms = _terms(vacancy.title) | frozenset(requirements)
+        self.columns = {term: index for index, term in enumerate(sorted(terms))}
+        # Вес требования по столбцу; термы только из заголовка весят 0
+        self.weights = np.zeros(len(self.columns))
+        for term, weight in requirements.items():
+            self.weights[self.columns[term]] = weight
+        self.total_weight = self.weights.sum()
+        self.required_years = REQUIRED_YEARS.get(vacancy.experience_level, 0)
+
+    def _documents(self, values):
+        """
+        Матрица 0/1 "текст x терм вакансии" только по различным текстам пачки (у многих
+        соискателей навыки и профессия совпадают) и индекс строки матрицы для каждого отклика
+        """
+        texts, rows = np.unique(np.array([value or '' for value in values], dtype=object), return_inverse=True)
+        matrix = np.zeros((len(texts), len(self.columns)))
+        for index, text in enumerate(texts):
+            matrix[index, [self.columns[term] for term in _terms(text) if term in self.columns]] = 1.0
+        return texts, matrix, rows
+
+    def score_batch(self, skills, professions, experience_years):
+        """(итог, навыки, опыт, профессия) для пачки откликов - массивы; составляющие в диапазоне 0..1"""
+        count = len(skills)
+        _, skills_matrix, skills_rows = self._documents(skills)
+        profession_texts, profession_matrix, profession_rows = self._documents(professions)
+
+        # Доля веса требований, которую закрывают навыки и профессия соискателя
+        if self.total_weight:
+            portfolio = np.maximum(skills_matrix[skills_rows], profession_matrix[profession_rows])
+            skills_score = portfolio @ self.weights / self.total_weight
+        else:
+            skills_score = np.zeros(count)
+
+        years = np.array([value or 0 for value in experience_years], dtype=float)
+        if self.required_years:
+            experience_score = np.minimum(years / self.required_years, 1.0)
+        else:
+            experience_score = np.ones(count)
+
+        # Доля термов профессии, встречающихся в заголовке или требованиях
+        lengths = np.array([len(_terms(text)) for text in profession_texts], dtype=float)[profession_rows]
+        matched = profession_matrix.sum(axis=1)[profession_rows]
+        profession_score = np.divide(matched, lengths, out=np.zeros(count), where=lengths > 0)
+
+        total = np.round(100 * (SKILLS_WEIGHT * skills_score
+                                + EXPERIENCE_WEIGHT * experience_score
+                                + PROFESSION_WEIGHT * profession_score), 1)
+        return total, skills_score, experience_score, profession_score
+
+
+def refresh_scores(vacancy, batch_size=SCORE_BATCH_SIZE):
+    """
+    Пересчитывает оценки только тех откликов, у которых их нет или они старше
+    последнего изменения вакансии или портфолио. Одна выборка и один пакетный
+    UPSERT на batch_size откликов. Возвращает число пересчитанных оценок.
+    """
+    profile = VacancyProfile(vacancy)
+    now = datetime.utcnow()
+    refreshed = 0
+    last_id = 0
+    while True:
+        # Пачки по id: upsert не должен менять таблицу под открытым курсором выборки
+        stale = (
+            db.session.query(Application.id, Portfolio.skills, Portfolio.profession, Portfolio.experience_years)
+            .join(Portfolio, Application.portfolio_id == Portfolio.id)
+            .outerjoin(ApplicationScore, ApplicationScore.application_id == Application.id)
+            .filter(Application.vacancy_id == vacancy.id,
+                    Application.id > last_id,
+                    or_(ApplicationScore.application_id.is_(None),
+                        ApplicationScore.computed_at < Portfolio.updated_at,
+                        ApplicationScore.computed_at < vacancy.updated_at))
+            .order_by(Application.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not stale:
+            return refreshed
+
+        ids, skills, professions, years = zip(*stale)
+        scores = zip(*(values.tolist() for values in profile.score_batch(skills, professions, years)))
+        rows = [{
+            'application_id': application_id,
+            'vacancy_id': vacancy.id,
+            'score': score,
+            'skills_score': skills_score,
+            'experience_score': experience_score,
+            'profession_score': profession_score,
+            'computed_at': now,
+        } for application_id, (score, skills_score, experience_score, profession_score) in zip(ids, scores)]
+        refreshed += _upsert(rows)
+        last_id = stale[-1].id
+
+
+def _upsert(rows):
+    stmt = insert(ApplicationScore.__table__)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[ApplicationScore.application_id],
+        set_={name: stmt.excluded[name] for name in
+              ('vacancy_id', 'score', 'skills_score', 'experience_score', 'profession_score', 'computed_at')}
+    ), rows)
+    return len(rows)
+
+
+def ranked_applications_query(vacancy):
+    """Отклики вакансии вместе с оценкой; сортировку задаёт keyset_paginate"""
+    return (db.session.query(Application, ApplicationScore)
+            .join(ApplicationScore, ApplicationScore.application_id == Application.id)
+            .filter(Application.vacancy_id == vacancy.id))
+
+
+def delete_scores(application_ids_query):
+    """Удаляет кэш оценок для откликов, выбранных подзапросом id (для массовых удалений)"""
+    return db.session.execute(
+        db.delete(ApplicationScore).where(ApplicationScore.application_id.in_(application_ids_query)),
+        execution_options={'synchronize_session': False}
+    ).rowcount
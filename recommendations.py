@@ -0,0 +1,219 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+
+from models import db, Vacancy
+from search import normalize_word
+from page_cache import current_generation
+
+# Навыки вида "C++", "C#", "Node.js" не должны разваливаться на буквы
+SKILL_RE = re.compile(r'\w[\w+#]*', re.UNICODE)
+
+STOP_WORDS = {
+    'и', 'в', 'во', 'на', 'с', 'со', 'по', 'от', 'до', 'для', 'или', 'а', 'не', 'из', 'за', 'к', 'о', 'об',
+    'опыт', 'знание', 'умение', 'навыки', 'работа', 'лет', 'год', 'хороший', 'уверенный', 'желательно',
+    'and', 'or', 'the', 'of', 'with', 'in', 'to', 'a', 'an', 'experience', 'knowledge',
+}
+# Стоп-слова сравниваются уже после стемминга
+STOP_TERMS = {normalize_word(word) for word in STOP_WORDS}
+
+# Заголовок вакансии весит меньше требований
+TITLE_WEIGHT = 0.5
+DEFAULT_TOP_K = 5
+
+# updated_at ставится при flush, а не при коммите: транзакция, начатая раньше, может
+# зафиксироваться уже после синхронизации более свежих строк. Поэтому каждая синхронизация
+# заново просматривает изменения за последние SYNC_OVERLAP; повторное применение строки безвредно
+SYNC_OVERLAP = timedelta(minutes=2)
+
+
+def tokenize_skills(value):
+    """Разбивает текст навыков/требований на нормализованные термы"""
+    terms = []
+    for word in SKILL_RE.findall(value or ''):
+        term = normalize_word(word)
+        if len(term) > 1 and term not in STOP_TERMS:
+            terms.append(term)
+    return terms
+
+
+def vacancy_vector(title, requirements):
+    """Разреженный вектор вакансии: терм -> вес"""
+    vector = Counter(tokenize_skills(requirements))
+    for term in tokenize_skills(title):
+        vector[term] += TITLE_WEIGHT
+    return vector
+
+
+class VacancyRecommender:
+    """
+    Инвертированный индекс по требованиям одобренных активных вакансий.
+    Вес терма - TF вакансии, IDF считается при запросе по текущему df, поэтому
+    добавление и удаление вакансий не требует пересчёта остальных векторов.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._vectors = {}
+        self._norms = {}
+        self._watermark = None
+        self._built = False
+        # Поколение списков вакансий (page_cache) на момент последней сверки с базой
+        self._generation = None
+        # Активные вакансии без термов: в индекс не попадают, но сверку уже прошли
+        self._empty = set()
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def add_or_update(self, vacancy_id, vector):
+        with self._lock:
+            self._remove(vacancy_id)
+            if not vector:
+                self._empty.add(vacancy_id)
+                return
+            self._vectors[vacancy_id] = vector
+            self._norms[vacancy_id] = math.sqrt(sum(weight * weight for weight in vector.values()))
+            for term, weight in vector.items():
+                self._postings.setdefault(term, {})[vacancy_id] = weight
+
+    def remove(self, vacancy_id):
+        with self._lock:
+            self._remove(vacancy_id)
+
+    def _remove(self, vacancy_id):
+        self._empty.discard(vacancy_id)
+        vector = self._vectors.pop(vacancy_id, None)
+        self._norms.pop(vacancy_id, None)
+        if not vector:
+            return
+        for term in vector:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(vacancy_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def top_k(self, terms, k=DEFAULT_TOP_K, exclude=()):
+        """Top-k вакансий по косинусной близости TF-IDF к набору термов"""
+        query = Counter(terms)
+        with self._lock:
+            total = len(self._vectors)
+            if not total or not query:
+                return []
+
+            scores = {}
+            for term, query_weight in query.items():
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + total / len(posting))
+                for vacancy_id, weight in posting.items():
+                    scores[vacancy_id] = scores.get(vacancy_id, 0.0) + query_weight * weight * idf * idf
+
+            candidates = ((score / self._norms[vacancy_id], vacancy_id)
+                          for vacancy_id, score in scores.items() if vacancy_id not in exclude)
+            return [(vacancy_id, score) for score, vacancy_id in heapq.nlargest(k, candidates)]
+
+    def sync(self, batch_size=1000):
+        """
+        Подтягивает вакансии, изменённые после последней синхронизации (по updated_at,
+        с перекрытием SYNC_OVERLAP). Первый вызов строит индекс целиком, дальше обрабатываются
+        только изменения - в том числе сделанные другими процессами.
+        """
+        with self._lock:
+            # Поколение читается до выборок: изменение, зафиксированное после этого, увеличит его снова
+            generation = current_generation()
+            query = db.session.query(Vacancy.id, Vacancy.title, Vacancy.requirements,
+                                     Vacancy.is_active, Vacancy.is_approved, Vacancy.updated_at)
+            if self._built and self._watermark is not None:
+                query = query.filter(Vacancy.updated_at >= self._watermark - SYNC_OVERLAP)
+            else:
+                query = query.filter(Vacancy.is_active == True, Vacancy.is_approved == True)
+
+            for row in query.yield_per(batch_size):
+                if row.is_active and row.is_approved:
+                    self.add_or_update(row.id, vacancy_vector(row.title, row.requirements))
+                else:
+                    self._remove(row.id)
+                if row.updated_at and (self._watermark is None or row.updated_at > self._watermark):
+                    self._watermark = row.updated_at
+
+            if self._built and generation != self._generation:
+                self._reconcile(batch_size)
+            self._built = True
+            self._generation = generation
+
+    def _reconcile(self, batch_size):
+        """
+        Сверяет набор проиндексированных id с активными одобренными вакансиями в базе.
+        Удалённые строки не найти по updated_at, а удаление в другом процессе не вызывает
+        событий в этом, поэтому после любого изменения вакансий (смены поколения) лишние id
+        убираются, а недостающие догружаются.
+        """
+        active = set(db.session.execute(
+            db.select(Vacancy.id).where(Vacancy.is_active == True, Vacancy.is_approved == True)
+        ).scalars())
+        indexed = set(self._vectors) | self._empty
+        for vacancy_id in indexed - active:
+            self._remove(vacancy_id)
+
+        missing = sorted(active - indexed)
+        for start in range(0, len(missing), batch_size):
+            rows = db.session.query(Vacancy.id, Vacancy.title, Vacancy.requirements).filter(
+                Vacancy.id.in_(missing[start:start + batch_size]))
+            for row in rows:
+                self.add_or_update(row.id, vacancy_vector(row.title, row.requirements))
+
+
+recommender = VacancyRecommender()
+
+
+def recommend_for_portfolio(portfolio, k=DEFAULT_TOP_K, exclude=()):
+    """Подходящие вакансии для портфолио в порядке убывания релевантности"""
+    if not portfolio:
+        return []
+
+    terms = tokenize_skills(portfolio.skills) + tokenize_skills(portfolio.profession)
+    if not terms:
+        return []
+
+    recommender.sync()
+    # Берём с запасом: часть вакансий могла быть удалена в другом процессе
+    ranked = recommender.top_k(terms, k * 2, exclude=set(exclude))
+    if not ranked:
+        return []
+
+    vacancies = Vacancy.query.options(joinedload(Vacancy.company)).filter(
+        Vacancy.id.in_([vacancy_id for vacancy_id, _ in ranked]),
+        Vacancy.is_active == True,
+        Vacancy.is_approved == True
+    ).all()
+    by_id = {vacancy.id: vacancy for vacancy in vacancies}
+    return [by_id[vacancy_id] for vacancy_id, _ in ranked if vacancy_id in by_id][:k]
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_deleted_vacancies(session, flush_context):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Vacancy)]
+    if deleted:
+        session.info.setdefault('deleted_vacancy_ids', []).extend(deleted)
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_deleted_vacancies(session):
+    # Удалённые строки нельзя найти по updated_at, поэтому убираем их из индекса явно
+    for vacancy_id in session.info.pop('deleted_vacancy_ids', []):
+        recommender.remove(vacancy_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_deleted_vacancies(session):
+    session.info.pop('deleted_vacancy_ids', None)
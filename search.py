@@ -0,0 +1,240 @@
+import re
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from models import db, Vacancy, Company
+
+# Полнотекстовый индекс вакансий на базе SQLite FTS5.
+# В индекс пишутся уже нормализованные (стеммированные) слова, поэтому
+# поиск «разработчика» находит «разработчик», «разработчики» и т.д.
+FTS_TABLE = 'vacancy_fts'
+
+# Веса колонок для bm25: title, description, requirements, company_name
+BM25_WEIGHTS = (10.0, 1.0, 3.0, 5.0)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+RU_VOWELS = 'аеиоуыэюя'
+
+RU_PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+RU_PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+RU_ADJECTIVE = ('ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой',
+                'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+RU_PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+RU_PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+RU_REFLEXIVE = ('ся', 'сь')
+RU_VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')
+RU_VERB_2 = ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+             'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю')
+RU_NOUN = ('иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой',
+           'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы',
+           'ь', 'ю', 'я')
+RU_SUPERLATIVE = ('ейше', 'ейш')
+RU_DERIVATIONAL = ('ость', 'ост')
+
+
+def _strip_suffix(word, suffixes, preceded_by=None):
+    """Отрезает самое длинное подходящее окончание, возвращает None если не нашлось"""
+    for suffix in sorted(suffixes, key=len, reverse=True):
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if preceded_by is None or (stem and stem[-1] in preceded_by):
+                return stem
+    return None
+
+
+def _strip_group(word, suffixes_after_a, suffixes_any):
+    """Окончания первой группы отрезаются только после «а»/«я» (правило Snowball)"""
+    stem = _strip_suffix(word, suffixes_after_a, preceded_by='ая')
+    if stem is not None:
+        return stem
+    return _strip_suffix(word, suffixes_any)
+
+
+def stem_russian(word):
+    """Облегчённый стеммер Портера (Snowball) для русского языка"""
+    word = word.lower().replace('ё', 'е')
+
+    # RV - часть слова после первой гласной
+    for i, char in enumerate(word):
+        if char in RU_VOWELS:
+            prefix, rv = word[:i + 1], word[i + 1:]
+            break
+    else:
+        return word
+
+    # Шаг 1: деепричастия, затем возвратные частицы и прилагательные/глаголы/существительные
+    stem = _strip_group(rv, RU_PERFECTIVE_GERUND_1, RU_PERFECTIVE_GERUND_2)
+    if stem is None:
+        rv = _strip_suffix(rv, RU_REFLEXIVE) or rv
+        stem = _strip_suffix(rv, RU_ADJECTIVE)
+        if stem is not None:
+            stem = _strip_group(stem, RU_PARTICIPLE_1, RU_PARTICIPLE_2) or stem
+        else:
+            stem = _strip_group(rv, RU_VERB_1, RU_VERB_2)
+            if stem is None:
+                stem = _strip_suffix(rv, RU_NOUN)
+    rv = stem if stem is not None else rv
+
+    # Шаг 2: «и» на конце
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательные суффиксы
+    rv = _strip_suffix(rv, RU_DERIVATIONAL) or rv
+
+    # Шаг 4: превосходная степень, «нн» и мягкий знак
+    rv = _strip_suffix(rv, RU_SUPERLATIVE) or rv
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif rv.endswith('ь'):
+        rv = rv[:-1]
+
+    return prefix + rv
+
+
+def normalize_word(word):
+    """Приводит слово к форме, в которой оно хранится в индексе"""
+    word = word.lower()
+    if re.search('[а-яё]', word):
+        return stem_russian(word)
+    return word
+
+
+def normalize_text(value):
+    """Стеммирует весь текст целиком для записи в индекс"""
+    if not value:
+        return ''
+    return ' '.join(normalize_word(word) for word in WORD_RE.findall(value))
+
+
+def build_match_query(search):
+    """Строит выражение MATCH для FTS5: все слова обязательны, с поиском по префиксу"""
+    terms = [normalize_word(word) for word in WORD_RE.findall(search or '')]
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms if term)
+
+
+def create_search_index(connection):
+    """Создаёт таблицу полнотекстового индекса, если её ещё нет. Возвращает True при создании"""
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first()
+    if exists:
+        return False
+
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "title, description, requirements, company_name, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    return True
+
+
+def remove_from_index(connection, vacancy_ids):
+    """Удаляет вакансии из индекса (используется при массовом удалении)"""
+    vacancy_ids = list(vacancy_ids)
+    if vacancy_ids:
+        connection.execute(
+            text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(str(int(i)) for i in vacancy_ids)})")
+        )
+
+
+def index_vacancies(connection, vacancy_ids):
+    """Переиндексирует указанные вакансии: одна выборка и один пакетный INSERT"""
+    vacancy_ids = list(vacancy_ids)
+    if not vacancy_ids:
+        return
+
+    remove_from_index(connection, vacancy_ids)
+
+    rows = connection.execute(
+        db.select(Vacancy.id, Vacancy.title, Vacancy.description, Vacancy.requirements, Company.company_name)
+        .join(Company, Vacancy.company_id == Company.id)
+        .where(Vacancy.id.in_(vacancy_ids))
+    ).all()
+
+    if rows:
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, title, description, requirements, company_name) "
+                 "VALUES (:id, :title, :description, :requirements, :company_name)"),
+            [{
+                'id': row.id,
+                'title': normalize_text(row.title),
+                'description': normalize_text(row.description),
+                'requirements': normalize_text(row.requirements),
+                'company_name': normalize_text(row.company_name),
+            } for row in rows]
+        )
+
+
+def rebuild_search_index(connection, batch_size=1000, commit=False):
+    """
+    Полностью перестраивает индекс, проходя по вакансиям пачками.
+    С commit=True каждая пачка фиксируется отдельно, чтобы не держать долгую блокировку записи.
+    """
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+
+    last_id = 0
+    while True:
+        ids = connection.execute(
+            db.select(Vacancy.id).where(Vacancy.id > last_id).order_by(Vacancy.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        index_vacancies(connection, ids)
+        last_id = ids[-1]
+        if commit:
+            connection.commit()
+
+
+def search_subquery(search):
+    """Подзапрос (id вакансии, релевантность) для строки поиска или None, если искать нечего"""
+    match = build_match_query(search)
+    if not match:
+        return None
+
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    return text(
+        f"SELECT rowid AS vacancy_id, bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    ).bindparams(match=match).columns(
+        db.column('vacancy_id', db.Integer),
+        db.column('rank', db.Float)
+    ).subquery('vacancy_search')
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_index_with_tables(target, connection, **kwargs):
+    if create_search_index(connection):
+        rebuild_search_index(connection)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """Держит индекс в актуальном состоянии в той же транзакции, что и изменения вакансий"""
+    reindex = set()
+    removed = set()
+    renamed_companies = set()
+
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Vacancy) and obj.id is not None:
+            reindex.add(obj.id)
+        elif isinstance(obj, Company) and obj.id is not None:
+            if db.inspect(obj).attrs.company_name.history.has_changes():
+                renamed_companies.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Vacancy) and obj.id is not None:
+            removed.add(obj.id)
+
+    if not reindex and not removed and not renamed_companies:
+        return
+
+    connection = session.connection()
+    if renamed_companies:
+        reindex.update(connection.execute(
+            db.select(Vacancy.id).where(Vacancy.company_id.in_(renamed_companies))
+        ).scalars())
+    remove_from_index(connection, removed)
+    index_vacancies(connection, reindex - removed)
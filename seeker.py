@@ -1,6 +1,15 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from models import Portfolio, Vacancy, Application, User, Company, db
+from models import Portfolio, Vacancy, Application, User, Notification, db
+from search import search_subquery
+from pagination import keyset_paginate, cached_count, get_per_page
+from page_cache import cached_page
+from recommendations import recommend_for_portfolio
+from identity import owned_portfolio, invalidate_identity
+from notifications import unread_count, mark_all_read
+from facets import vacancy_facets
+from applications import (apply_to_vacancy, apply_failure_reason, ALREADY_APPLIED, NO_PORTFOLIO,
+                          VACANCY_UNAVAILABLE)
 
 seeker = Blueprint('seeker', __name__)
 
@@ -12,12 +21,40 @@ def dashboard():
         flash('Доступ запрещен')
         return redirect(url_for('index'))
 
-    portfolio = Portfolio.query.filter_by(user_id=current_user.id).first()
+    portfolio = owned_portfolio()
     applications = Application.query.filter_by(seeker_id=current_user.id).all()
 
+    # Рекомендации по навыкам без вакансий, на которые соискатель уже откликнулся
+    recommended = recommend_for_portfolio(portfolio, exclude=[app.vacancy_id for app in applications])
+
     return render_template('seeker/dashboard.html',
                            portfolio=portfolio,
-                           applications=applications)
+                           applications=applications,
+                           recommended=recommended,
+                           unread_notifications=unread_count(current_user.id))
+
+
+@seeker.route('/seeker/notifications')
+@login_required
+def notifications():
+    if current_user.role != 'seeker':
+        flash('Доступ запрещен')
+        return redirect(url_for('index'))
+
+    items = Notification.query.filter_by(user_id=current_user.id).order_by(
+        Notification.created_at.desc(), Notification.id.desc()).limit(100).all()
+    return render_template('seeker/notifications.html', notifications=items)
+
+
+@seeker.route('/seeker/notifications/read', methods=['POST'])
+@login_required
+def read_notifications():
+    if current_user.role != 'seeker':
+        return redirect(url_for('index'))
+
+    mark_all_read(current_user.id)
+    db.session.commit()
+    return redirect(url_for('seeker.notifications'))
 
 
 @seeker.route('/seeker/portfolio/edit', methods=['GET', 'POST'])
@@ -26,7 +63,7 @@ def edit_portfolio():
     if current_user.role != 'seeker':
         return redirect(url_for('index'))
 
-    portfolio = Portfolio.query.filter_by(user_id=current_user.id).first()
+    portfolio = owned_portfolio()
 
     if request.method == 'POST':
         if not portfolio:
@@ -46,31 +83,40 @@ def edit_portfolio():
         portfolio.is_approved = False
 
         db.session.commit()
+        invalidate_identity(current_user.id)
         flash('Портфолио обновлено и отправлено на модерацию')
         return redirect(url_for('seeker.dashboard'))
 
     return render_template('seeker/edit_portfolio.html', portfolio=portfolio)
 
 
-@seeker.route('/vacancies')
-def vacancies():
+def searched_vacancies(search):
+    """Активные одобренные вакансии с полнотекстовым поиском, но без остальных фильтров"""
+    query = Vacancy.query.filter_by(is_active=True, is_approved=True)
+
+    # Полнотекстовый поиск по индексу (название, описание, требования, компания)
+    search_results = search_subquery(search)
+    if search_results is not None:
+        query = query.join(search_results, search_results.c.vacancy_id == Vacancy.id)
+    return query, search_results
+
+
+def paginate_vacancies(args, options=(), total=None):
+    """
+    Страница публичного списка вакансий с фильтрами и сортировкой из параметров запроса.
+    Общая для HTML-страницы и JSON API. Если общее количество уже известно (из фасетов),
+    отдельный COUNT не выполняется.
+    """
     # Получаем параметры поиска и фильтрации
-    search = request.args.get('search', '')
-    experience = request.args.get('experience', '')
-    employment_type = request.args.get('employment_type', '')
-    salary_min = request.args.get('salary_min', '')
+    search = args.get('search', '')
+    experience = args.get('experience', '')
+    employment_type = args.get('employment_type', '')
+    salary_min = args.get('salary_min', '')
 
     # Показываем только активные и одобренные вакансии
-    query = Vacancy.query.filter_by(is_active=True, is_approved=True)
+    query, search_results = searched_vacancies(search)
 
     # Применяем фильтры
-    if search:
-        query = query.filter(
-            (Vacancy.title.contains(search)) |
-            (Vacancy.description.contains(search)) |
-            (Company.company_name.contains(search))
-        ).join(Company)
-
     if experience and experience != 'all':
         query = query.filter(Vacancy.experience_level == experience)
 
@@ -80,24 +126,53 @@ def vacancies():
     if salary_min:
         query = query.filter(Vacancy.salary_max >= int(salary_min))
 
-    # Сортировка
-    sort_by = request.args.get('sort', 'newest')
-    if sort_by == 'salary_high':
-        query = query.order_by(Vacancy.salary_max.desc())
+    # Сортировка: колонка, направление и тай-брейкер по id задают keyset-пагинацию
+    sort_by = args.get('sort', 'newest')
+    position_getter = None
+    if sort_by == 'relevance' and search_results is not None:
+        sort_column, descending = search_results.c.rank, False
+        query = query.add_columns(search_results.c.rank)
+        position_getter = lambda row: (row.rank, row[0].id)
+    elif sort_by == 'salary_high':
+        sort_column, descending = Vacancy.salary_max, True
     elif sort_by == 'salary_low':
-        query = query.order_by(Vacancy.salary_max.asc())
+        sort_column, descending = Vacancy.salary_max, False
     else:  # newest
-        query = query.order_by(Vacancy.created_at.desc())
+        sort_column, descending = Vacancy.created_at, True
+
+    if total is None:
+        total = cached_count(('vacancies', search, experience, employment_type, salary_min), query)
+    page = keyset_paginate(query.options(*options), sort_column, Vacancy.id,
+                           descending=descending,
+                           cursor=args.get('cursor'),
+                           direction=args.get('direction', 'next'),
+                           per_page=get_per_page(args),
+                           position_getter=position_getter)
+    if position_getter is not None:
+        page.items = [row[0] for row in page.items]
+    page.total = total
+    return page
+
 
-    vacancies = query.all()
+@seeker.route('/vacancies')
+@cached_page()
+def vacancies():
+    search = request.args.get('search', '')
+    # Счётчики для боковой панели одним сгруппированным запросом; их сумма заменяет COUNT выдачи
+    facets = vacancy_facets(searched_vacancies(search)[0], search,
+                            request.args.get('experience', ''),
+                            request.args.get('employment_type', ''),
+                            request.args.get('salary_min', ''))
+    vacancies = paginate_vacancies(request.args, total=facets['total'])
 
     return render_template('seeker/vacancies.html',
                            vacancies=vacancies,
-                           search=search,
-                           experience=experience,
-                           employment_type=employment_type,
-                           salary_min=salary_min,
-                           sort=sort_by)
+                           facets=facets,
+                           search=request.args.get('search', ''),
+                           experience=request.args.get('experience', ''),
+                           employment_type=request.args.get('employment_type', ''),
+                           salary_min=request.args.get('salary_min', ''),
+                           sort=request.args.get('sort', 'newest'))
 
 
 @seeker.route('/seeker/apply/<int:vacancy_id>', methods=['POST'])
@@ -106,35 +181,27 @@ def apply(vacancy_id):
     if current_user.role != 'seeker':
         return redirect(url_for('index'))
 
-    vacancy = db.session.get(Vacancy, vacancy_id)
-    if not vacancy:
-        flash('Вакансия не найдена')
-        return redirect(url_for('seeker.vacancies'))
-
-    portfolio = Portfolio.query.filter_by(user_id=current_user.id).first()
-
-    if not portfolio:
+    if current_user.portfolio_id is None:
         flash('Сначала создайте портфолио')
         return redirect(url_for('seeker.edit_portfolio'))
 
-    # Проверяем, не откликался ли уже
-    existing_application = Application.query.filter_by(
-        vacancy_id=vacancy_id,
-        seeker_id=current_user.id
-    ).first()
-
-    if existing_application:
-        flash('Вы уже откликались на эту вакансию')
+    # Все проверки и вставка - один оператор; причину отказа выясняем только при неудаче
+    application_id = apply_to_vacancy(vacancy_id, current_user.id, current_user.portfolio_id,
+                                      request.form.get('cover_letter'))
+    if application_id is None:
+        db.session.rollback()
+        reason = apply_failure_reason(vacancy_id, current_user.id, current_user.portfolio_id)
+        if reason == NO_PORTFOLIO:
+            # Портфолио удалили в обход маршрутов - снимок личности устарел
+            invalidate_identity(current_user.id)
+            flash('Сначала создайте портфолио')
+            return redirect(url_for('seeker.edit_portfolio'))
+        if reason == ALREADY_APPLIED:
+            flash('Вы уже откликались на эту вакансию')
+        elif reason == VACANCY_UNAVAILABLE:
+            flash('Вакансия не найдена или закрыта для откликов')
         return redirect(url_for('seeker.vacancies'))
 
-    application = Application(
-        vacancy_id=vacancy_id,
-        seeker_id=current_user.id,
-        portfolio_id=portfolio.id,
-        cover_letter=request.form.get('cover_letter')
-    )
-
-    db.session.add(application)
     db.session.commit()
 
     flash('Отклик отправлен успешно!')
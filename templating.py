@@ -0,0 +1,62 @@
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+# Скомпилированные шаблоны переживают перезапуск процесса: новый worker читает готовый
+# байткод вместо разбора исходника. Jinja сама отбрасывает запись, если шаблон изменился
+BYTECODE_CACHE_DIR = 'jinja-cache'
+
+
+def bytecode_cache_dir(app):
+    return app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, BYTECODE_CACHE_DIR)
+
+
+class LazyBytecodeCache(FileSystemBytecodeCache):
+    """
+    Каталог кэша создаётся при первой записи, а не при создании приложения: CLI-команды
+    и импорт модуля ничего не пишут на диск. Ошибка записи не ломает отрисовку страницы.
+    """
+
+    def __init__(self, directory, logger):
+        super().__init__(directory)
+        self._logger = logger
+        self._disabled = False
+
+    def dump_bytecode(self, bucket):
+        if self._disabled:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            super().dump_bytecode(bucket)
+        except OSError:
+            self._disabled = True
+            self._logger.warning('Кэш байткода шаблонов отключён: нет доступа к %s', self.directory)
+
+
+def warm_templates(app):
+    """
+    Компилирует все шаблоны приложения заранее, чтобы первый запрос к каждой странице
+    не платил за разбор. Возвращает (число шаблонов, мс); шаблоны с ошибками пропускаются с записью в лог.
+    """
+    started = time.perf_counter()
+    names = app.jinja_env.list_templates()
+    for name in names:
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError:
+            app.logger.exception('Не удалось скомпилировать шаблон %s', name)
+    return len(names), (time.perf_counter() - started) * 1000
+
+
+def init_templating(app):
+    """
+    Подключает кэш байткода Jinja (JINJA_BYTECODE_CACHE=False отключает). Прогрев шаблонов
+    включается TEMPLATE_WARMUP=True - только для процесса, который будет обслуживать запросы
+    (python app.py, worker gunicorn), а не для CLI-команд и импорта модуля.
+    """
+    if app.config.get('JINJA_BYTECODE_CACHE', True):
+        app.jinja_env.bytecode_cache = LazyBytecodeCache(bytecode_cache_dir(app), app.logger)
+
+    if app.config.get('TEMPLATE_WARMUP', False):
+        warm_templates(app)
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db, User, Company, Vacancy, Portfolio  # noqa: E402
+from identity import identity_cache  # noqa: E402
+from page_cache import page_cache  # noqa: E402
+
+PASSWORD = 'Password123!'
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Фабрика приложений: каждое - на своей временной файловой SQLite со схемой после flask migrate"""
+    apps = []
+
+    def make_app():
+        # Кэши живут на уровне процесса, а id в новых базах повторяются
+        identity_cache.clear()
+        page_cache.clear()
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / f"test{len(apps)}.db"}',
+            'JINJA_BYTECODE_CACHE': False,
+            'LOGIN_THROTTLE_ENABLED': False,
+        })
+        result = app.test_cli_runner().invoke(args=['migrate'])
+        assert result.exit_code == 0, result.output
+        apps.append(app)
+        return app
+
+    # Контекст приложения тесты открывают сами: общий с запросами тестового клиента
+    # контекст сохранял бы g (и current_user) между запросами
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def create_user(email, role):
+    # Мало итераций pbkdf2: в тестах важна скорость, а не стойкость хэша
+    user = User(email=email, name=email.split('@')[0], role=role,
+                password=generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000'))
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def create_employer(email='employer@example.com'):
+    employer = create_user(email, 'employer')
+    company = Company(user_id=employer.id, company_name='Компания', is_approved=True)
+    db.session.add(company)
+    db.session.flush()
+    return employer, company
+
+
+def create_vacancy(employer, company, **fields):
+    values = dict(title='Разработчик Python', description='Разработка веб-приложений',
+                  requirements='Python, Flask, SQL', is_active=True, is_approved=True)
+    values.update(fields)
+    vacancy = Vacancy(employer_id=employer.id, company_id=company.id, **values)
+    db.session.add(vacancy)
+    db.session.flush()
+    return vacancy
+
+
+def create_seeker(email='seeker@example.com'):
+    seeker = create_user(email, 'seeker')
+    portfolio = Portfolio(user_id=seeker.id, title='Портфолио', profession='Python-разработчик',
+                          skills='Python, Flask', experience_years=2, is_approved=True)
+    db.session.add(portfolio)
+    db.session.flush()
+    return seeker, portfolio
+
+
+def login(client, email):
+    response = client.post('/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302
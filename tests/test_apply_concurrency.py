@@ -0,0 +1,63 @@
+import threading
+
+from models import db, Application, Vacancy
+from applications import apply_to_vacancy
+from conftest import create_employer, create_vacancy, create_seeker, login
+
+THREADS = 150
+
+
+def create_fixtures():
+    employer, company = create_employer()
+    vacancy = create_vacancy(employer, company)
+    seeker, portfolio = create_seeker()
+    db.session.commit()
+    return vacancy.id, seeker.id, portfolio.id
+
+
+def test_simultaneous_applies_create_one_application(app):
+    with app.app_context():
+        vacancy_id, seeker_id, portfolio_id = create_fixtures()
+
+    barrier = threading.Barrier(THREADS)
+    results = []
+    errors = []
+
+    def apply():
+        # У каждого потока свой контекст приложения и своя сессия
+        with app.app_context():
+            try:
+                barrier.wait()
+                results.append(apply_to_vacancy(vacancy_id, seeker_id, portfolio_id))
+                db.session.commit()
+            except Exception as exc:
+                errors.append(exc)
+                db.session.rollback()
+
+    threads = [threading.Thread(target=apply) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len([result for result in results if result is not None]) == 1
+    with app.app_context():
+        assert Application.query.count() == 1
+        vacancy = db.session.get(Vacancy, vacancy_id)
+        assert vacancy.applications_count == 1
+        assert vacancy.pending_count == 1
+
+
+def test_repeated_apply_through_route(app):
+    with app.app_context():
+        vacancy_id, _, _ = create_fixtures()
+
+    client = app.test_client()
+    login(client, 'seeker@example.com')
+    for _ in range(2):
+        assert client.post(f'/seeker/apply/{vacancy_id}').status_code == 302
+
+    with app.app_context():
+        assert Application.query.count() == 1
+        assert db.session.get(Vacancy, vacancy_id).applications_count == 1
@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from models import db, Application
+from conftest import create_employer, create_vacancy, create_seeker, login
+
+# Компания, вакансии и отклики вместе с соискателями и портфолио; пользователь берётся
+# из кэша процесса. Число не должно зависеть от количества вакансий и откликов
+QUERY_BUDGET = 3
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def populate(vacancies_count, seekers_count):
+    """vacancies_count вакансий, на каждую откликается каждый из seekers_count соискателей"""
+    employer, company = create_employer()
+    vacancies = [create_vacancy(employer, company, title=f'Вакансия {index}') for index in range(vacancies_count)]
+    for index in range(seekers_count):
+        seeker, portfolio = create_seeker(f'seeker{index}@example.com')
+        db.session.add_all(Application(vacancy_id=vacancy.id, seeker_id=seeker.id, portfolio_id=portfolio.id)
+                           for vacancy in vacancies)
+    db.session.commit()
+    return Application.query.count()
+
+
+def dashboard_queries(app, vacancies_count, seekers_count):
+    with app.app_context():
+        assert populate(vacancies_count, seekers_count) == vacancies_count * seekers_count
+        engine = db.engine
+
+    client = app.test_client()
+    login(client, 'employer@example.com')
+    # Первый запрос заполняет кэш пользователя процесса, считаем второй
+    assert client.get('/employer/dashboard').status_code == 200
+    with count_queries(engine) as statements:
+        response = client.get('/employer/dashboard')
+    assert response.status_code == 200
+    return statements
+
+
+def test_dashboard_query_count_does_not_grow(make_app):
+    small = dashboard_queries(make_app(), 1, 1)
+    large = dashboard_queries(make_app(), 50, 10)
+
+    assert len(small) == len(large), large
+    assert len(large) <= QUERY_BUDGET, large
@@ -0,0 +1,41 @@
+import tracemalloc
+
+import pytest
+from sqlalchemy import text
+
+from models import db
+from export import export_stream
+
+ROWS = 1_000_000
+# Потолок пиковой памяти на выгрузку; от числа строк он зависеть не должен
+MEMORY_CEILING = 16 * 1024 * 1024
+
+
+def insert_users(rows):
+    # Строки генерирует сама SQLite (рекурсивный CTE), в Python они не проходят
+    db.session.execute(text(
+        "INSERT INTO user (id, email, password, name, role, is_active, created_at) "
+        "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows) "
+        "SELECT n, 'user' || n || '@example.com', 'x', 'Пользователь ' || n, 'seeker', 1, "
+        "'2024-01-01 00:00:00.000000' FROM seq"
+    ), {'rows': rows})
+    db.session.commit()
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize('export_format, header_lines', [('csv', 1), ('jsonl', 0)])
+def test_export_million_rows_within_memory_ceiling(app, export_format, header_lines):
+    with app.app_context():
+        insert_users(ROWS)
+
+        tracemalloc.start()
+        try:
+            lines = 0
+            for chunk in export_stream('users', export_format):
+                lines += chunk.count('\n')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    assert lines == ROWS + header_lines
+    assert peak < MEMORY_CEILING, f'пик {peak / 1024 / 1024:.1f} МиБ'
@@ -0,0 +1,30 @@
+from sqlalchemy import text
+
+from models import db
+from migrations import run_migrations, VERSION_TABLE
+
+# Таблицы, существовавшие до миграций; индексы более новых таблиц создаёт create_all вместе с ними
+LEGACY_TABLES = ('user', 'company', 'portfolio', 'vacancy', 'application')
+
+
+def legacy_indexes(conn):
+    placeholders = ', '.join(f"'{table}'" for table in LEGACY_TABLES)
+    return set(conn.execute(text(
+        f"SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})"
+    )).scalars())
+
+
+def test_migrations_create_every_declared_index(app):
+    """Старая база без индексов после миграций получает те же индексы, что объявлены в models.py"""
+    with app.app_context():
+        declared = {index.name for table in db.metadata.sorted_tables if table.name in LEGACY_TABLES
+                    for index in table.indexes}
+        with db.engine.connect() as conn:
+            for name in legacy_indexes(conn):
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text(f"DELETE FROM {VERSION_TABLE} WHERE version >= 4"))
+            conn.commit()
+
+        assert run_migrations(db.engine)
+        with db.engine.connect() as conn:
+            assert legacy_indexes(conn) == declared
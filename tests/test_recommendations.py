@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from models import db, Vacancy
+from recommendations import VacancyRecommender, vacancy_vector
+from bulk import delete_vacancies
+from conftest import create_employer, create_vacancy
+
+
+def test_sync_picks_up_change_committed_after_newer_rows(app):
+    with app.app_context():
+        employer, company = create_employer()
+        early = create_vacancy(employer, company, title='Аналитик данных', is_active=False)
+        late = create_vacancy(employer, company, title='Разработчик Go')
+        db.session.commit()
+
+        worker = VacancyRecommender()
+        worker.sync()
+        assert len(worker) == 1
+
+        # Транзакция получила updated_at раньше, чем строка, которую рабочий процесс уже видел,
+        # а зафиксировалась позже
+        now = datetime.utcnow()
+        db.session.execute(db.update(Vacancy).where(Vacancy.id == late.id).values(updated_at=now))
+        db.session.commit()
+        worker.sync()
+        db.session.execute(db.update(Vacancy).where(Vacancy.id == early.id)
+                           .values(is_active=True, updated_at=now - timedelta(seconds=30)))
+        db.session.commit()
+        worker.sync()
+
+        assert worker.top_k(vacancy_vector('Аналитик', ''), k=5)[0][0] == early.id
+
+
+def test_sync_drops_vacancies_deleted_by_another_process(app):
+    with app.app_context():
+        employer, company = create_employer()
+        vacancies = [create_vacancy(employer, company, title=f'Аналитик данных {index}') for index in range(3)]
+        db.session.commit()
+
+        worker = VacancyRecommender()
+        worker.sync()
+        assert len(worker) == 3
+
+        # Удаление в обход ORM, как в массовых действиях администратора другого процесса
+        delete_vacancies([vacancies[0].id, vacancies[1].id])
+        db.session.commit()
+        worker.sync()
+
+        assert [vacancy_id for vacancy_id, _ in worker.top_k(vacancy_vector('Аналитик', ''))] == [vacancies[2].id]
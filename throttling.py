@@ -0,0 +1,196 @@
+import secrets
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Лимиты по умолчанию: попыток в минуту и запас для коротких всплесков.
+# Переопределяются LOGIN_IP_RATE / LOGIN_IP_BURST и LOGIN_ACCOUNT_RATE / LOGIN_ACCOUNT_BURST
+IP_RATE = 30
+IP_BURST = 30
+ACCOUNT_RATE = 5
+ACCOUNT_BURST = 10
+# Сколько ключей (адресов, email) помнит каждый ограничитель
+MAX_KEYS = 10000
+
+# Проверка pbkdf2 занимает процессор на десятки миллисекунд, поэтому одновременно
+# их выполняется не больше LOGIN_HASH_WORKERS, а в очереди ждут не больше LOGIN_HASH_QUEUE
+HASH_WORKERS = 4
+HASH_QUEUE = 16
+LATENCY_SAMPLES = 1000
+
+# Тем же методом хэшируются пароли при регистрации (auth.register)
+PASSWORD_METHOD = 'pbkdf2:sha256'
+
+
+class TokenBucketLimiter:
+    """
+    Корзины маркеров по ключу: корзина пополняется со скоростью rate в минуту до burst,
+    каждая попытка забирает маркер. Хранится не больше max_keys корзин, давно
+    не использованные вытесняются первыми.
+    """
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def allow(self, key, rate, burst):
+        """Забирает маркер; возвращает (разрешено, через сколько секунд появится маркер)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate / 60)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                allowed, retry_after = True, 0
+            else:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                allowed, retry_after = False, (1 - tokens) * 60 / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self._buckets), 'rejected': self.rejected}
+
+
+class Overloaded(Exception):
+    """Очередь проверки паролей заполнена - попытку отклоняем, не вычисляя хэш"""
+
+
+class PasswordVerifier:
+    """Ограниченный пул потоков для проверки паролей со сбросом нагрузки по длине очереди"""
+
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-check')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._dummy_hash = None
+        self.shed = 0
+        # (ожидание в очереди, вычисление хэша) последних проверок, в секундах
+        self._latency = deque(maxlen=LATENCY_SAMPLES)
+
+    def dummy_hash(self):
+        # Хэш случайного пароля с теми же параметрами, что у настоящих: проверка
+        # для несуществующего email стоит столько же, сколько для существующего.
+        # Считается в пуле при первой проверке, а не при старте процесса
+        if self._dummy_hash is None:
+            self._dummy_hash = generate_password_hash(secrets.token_urlsafe(16), method=PASSWORD_METHOD)
+        return self._dummy_hash
+
+    def _check(self, password_hash, password, submitted):
+        started = time.perf_counter()
+        try:
+            if password_hash is None:
+                # Результат не важен, важна одинаковая стоимость проверки
+                check_password_hash(self.dummy_hash(), password)
+                return False
+            return check_password_hash(password_hash, password)
+        finally:
+            finished = time.perf_counter()
+            self._latency.append((started - submitted, finished - started))
+
+    def verify(self, password_hash, password):
+        """
+        Проверяет пароль в пуле; password_hash=None - проверка против фиктивного хэша
+        (всегда неуспешна). Бросает Overloaded, если ждущих проверок больше queue_size.
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_size:
+                self.shed += 1
+                raise Overloaded()
+            self._in_flight += 1
+        try:
+            return self._executor.submit(self._check, password_hash, password, time.perf_counter()).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self):
+        samples = list(self._latency)
+        with self._lock:
+            stats = {'workers': self.workers, 'queue_size': self.queue_size,
+                     'in_flight': self._in_flight, 'shed': self.shed, 'checks': len(samples)}
+        for name, index in (('wait', 0), ('hash', 1)):
+            values = sorted(sample[index] * 1000 for sample in samples)
+            stats[name] = {
+                'p50': round(statistics.median(values), 2) if values else 0.0,
+                'p95': round(values[min(len(values) - 1, int(0.95 * len(values)))], 2) if values else 0.0,
+                'max': round(values[-1], 2) if values else 0.0,
+            }
+        return stats
+
+
+class LoginThrottle:
+    """Ограничители попыток входа по адресу и по учётной записи плюс пул проверки паролей"""
+
+    def __init__(self, app):
+        self.enabled = app.config.get('LOGIN_THROTTLE_ENABLED', True)
+        self.ip_rate = app.config.get('LOGIN_IP_RATE', IP_RATE)
+        self.ip_burst = app.config.get('LOGIN_IP_BURST', IP_BURST)
+        self.account_rate = app.config.get('LOGIN_ACCOUNT_RATE', ACCOUNT_RATE)
+        self.account_burst = app.config.get('LOGIN_ACCOUNT_BURST', ACCOUNT_BURST)
+        max_keys = app.config.get('LOGIN_THROTTLE_MAX_KEYS', MAX_KEYS)
+        self.by_ip = TokenBucketLimiter(max_keys)
+        self.by_account = TokenBucketLimiter(max_keys)
+        self.verifier = PasswordVerifier(app.config.get('LOGIN_HASH_WORKERS', HASH_WORKERS),
+                                         app.config.get('LOGIN_HASH_QUEUE', HASH_QUEUE))
+        self._lock = threading.Lock()
+        self.failed = 0
+        self.succeeded = 0
+
+    def check(self, address, email):
+        """
+        Проверяет оба лимита до обращения к базе и вычисления хэша. Лимит по email действует
+        и для несуществующих адресов, иначе по отказам можно было бы перебирать учётные записи.
+        Возвращает 0, если попытка разрешена, иначе число секунд до следующей.
+        """
+        if not self.enabled:
+            return 0
+        allowed, retry_after = self.by_ip.allow(address, self.ip_rate, self.ip_burst)
+        if allowed:
+            allowed, retry_after = self.by_account.allow(email, self.account_rate, self.account_burst)
+        return 0 if allowed else max(1, round(retry_after))
+
+    def verify(self, user, password):
+        """Одинаковая работа для известного и неизвестного email; может бросить Overloaded"""
+        valid = self.verifier.verify(user.password if user else None, password)
+        with self._lock:
+            if valid:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        return valid
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'by_ip': self.by_ip.stats(),
+            'by_account': self.by_account.stats(),
+            'verifier': self.verifier.stats(),
+        }
+
+
+def login_throttle():
+    return current_app.extensions['login_throttle']
+
+
+def init_throttling(app):
+    app.extensions['login_throttle'] = LoginThrottle(app)